@@ -1,18 +1,31 @@
 import os
+import time
+import click
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from functools import wraps
 from flask import Flask, render_template, request, redirect, url_for, session, flash, send_file, jsonify
-from models import db, Course, Person, CustomQuestion, Answer, HotelRequest, UploadedFile, EmailTemplate, Admin
+from models import db, Course, Person, CustomQuestion, Answer, HotelRequest, UploadedFile, EmailTemplate, Admin, ExportJob, \
+    PersonImport, EmailBatch
 from flask_mail import Mail
 from werkzeug.utils import secure_filename
 from config import config
 from models import db, Course, Person, CustomQuestion, Answer, HotelRequest, UploadedFile, EmailTemplate
 from email_service import mail, send_rsvp_email, send_info_form_email, send_info_reminder_email, \
     send_hotel_request_email, send_hotel_reminder_email, send_hotel_final_notice_email, \
-    send_file_upload_notification, send_bulk_rsvp_emails, send_bulk_info_form_emails, \
-    send_bulk_hotel_request_emails, process_info_reminders, process_hotel_reminders
-from utils import allowed_file, generate_hotel_summary, export_to_excel, parse_uploaded_csv, \
-    initialize_default_email_templates, get_person_statistics, save_uploaded_file
+    send_file_upload_notification, process_info_reminders, process_hotel_reminders
+from email_queue import enqueue_bulk_emails, start_outbox_workers, outbox_workers_active, drain_outbox, \
+    get_batch_progress
+from utils import allowed_file, generate_hotel_summary, export_to_excel, parse_uploaded_csv, import_persons, \
+    start_person_import, run_person_import, resumable_import_condition, allowed_roster_file, get_person_statistics, \
+    get_courses_statistics, save_uploaded_file, invalidate_email_template, get_roster_page, ROSTER_SORTS, \
+    get_course_questions, bump_questions_version
+from export_jobs import submit_export, get_artifact_path, requeue_stale_export
+from scheduler import start_scheduler
+from file_storage import UploadRequest, BLOB_DIRECTORY, stored_file_path, release_uploaded_files, \
+    remove_stored_files, migrate_legacy_upload
+from schema import SCHEMA_VERSION, get_schema_version, bootstrap_database, explain_hot_queries
 
 
 def create_app(config_name=None):
@@ -24,6 +37,7 @@ def create_app(config_name=None):
     
     # Create Flask app
     app = Flask(__name__)
+    app.request_class = UploadRequest
     
     # Load configuration
     app.config.from_object(config[config_name])
@@ -36,13 +50,18 @@ def create_app(config_name=None):
     # Create upload folder
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
-    # Create database tables and initialize templates
+    # Tables, indexes and default templates are set up by `flask init-db` (release step);
+    # worker startup only checks the recorded schema version
     with app.app_context():
         try:
-            db.create_all()
-            initialize_default_email_templates()
-            print("✅ Database initialized")
-            print("✅ Email templates initialized")
+            version = get_schema_version()
+            if version != SCHEMA_VERSION:
+                if app.config['AUTO_INIT_DB']:
+                    bootstrap_database()
+                    print(f"✅ Database initialized (schema version {SCHEMA_VERSION})")
+                else:
+                    print(f"⚠️  Database schema is at version {version}, expected {SCHEMA_VERSION}. "
+                          f"Run `flask init-db`.")
         except Exception as e:
             print(f"⚠️  Database initialization note: {e}")
     
@@ -116,10 +135,8 @@ def admin_dashboard():
     """Admin dashboard - list all courses"""
     courses = Course.query.order_by(Course.start_date.desc()).all()
     
-    # Get statistics for each course
-    course_stats = {}
-    for course in courses:
-        course_stats[course.id] = get_person_statistics(course.id)
+    # Get statistics for all courses in one query
+    course_stats = get_courses_statistics([course.id for course in courses])
     
     return render_template('admin/dashboard.html', courses=courses, course_stats=course_stats)
 
@@ -161,9 +178,22 @@ def course_detail(course_id):
     """Course detail page"""
     course = Course.query.get_or_404(course_id)
     
-    # Get participants and faculty separately
-    participants = Person.query.filter_by(course_id=course_id, role='PARTICIPANT').all()
-    faculty = Person.query.filter_by(course_id=course_id, role='FACULTY').all()
+    # Roster page: filters, sort and keyset cursor come from the query string
+    roster_filters = {
+        'role': request.args.get('role', ''),
+        'status': request.args.get('status', ''),
+        'info': request.args.get('info', ''),
+        'hotel': request.args.get('hotel', ''),
+    }
+    roster_sort = request.args.get('sort', 'created')
+    
+    persons, roster_total, prev_cursor, next_cursor = get_roster_page(
+        course_id,
+        roster_filters,
+        roster_sort,
+        after=request.args.get('after'),
+        before=request.args.get('before')
+    )
     
     # Get statistics
     stats = get_person_statistics(course_id)
@@ -174,13 +204,25 @@ def course_detail(course_id):
     # Get custom questions
     questions = CustomQuestion.query.filter_by(course_id=course_id).order_by(CustomQuestion.order).all()
     
+    # Bulk send to show progress for, after queuing emails
+    email_batch = EmailBatch.query.filter_by(
+        id=request.args.get('email_batch', type=int),
+        course_id=course_id
+    ).first()
+    
     return render_template('admin/course_detail.html', 
                          course=course, 
-                         participants=participants,
-                         faculty=faculty,
+                         persons=persons,
+                         roster_total=roster_total,
+                         roster_filters=roster_filters,
+                         roster_sort=roster_sort,
+                         roster_sorts=ROSTER_SORTS,
+                         prev_cursor=prev_cursor,
+                         next_cursor=next_cursor,
                          stats=stats,
                          hotel_summary=hotel_summary,
-                         questions=questions)
+                         questions=questions,
+                         email_batch=email_batch)
 
 
 @app.route('/admin/course/<int:course_id>/edit', methods=['GET', 'POST'])
@@ -227,8 +269,11 @@ def delete_course(course_id):
     course = Course.query.get_or_404(course_id)
     
     try:
+        files = UploadedFile.query.join(Person).filter(Person.course_id == course_id).all()
+        removable = release_uploaded_files(files)
         db.session.delete(course)
         db.session.commit()
+        remove_stored_files(removable)
         flash(f'Course "{course.name}" deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -258,49 +303,89 @@ def upload_persons(course_id):
             flash('No file selected.', 'danger')
             return redirect(request.url)
         
+        if not allowed_roster_file(file.filename):
+            flash('Unsupported file type. Please upload a .csv, .xlsx or .xls file.', 'danger')
+            return redirect(request.url)
+        
+        update_existing = request.form.get('update_existing') == 'on'
+        
+        # Large rosters are imported in committed chunks that can be resumed
+        if request.content_length and request.content_length > app.config['IMPORT_STREAM_THRESHOLD']:
+            person_import = start_person_import(course_id, file, update_existing)
+            return finish_person_import(person_import)
+        
         if file:
             # Parse file
-            persons_data, error = parse_uploaded_csv(file)
+            persons_data, rejected, error = parse_uploaded_csv(file)
             
             if error:
                 flash(error, 'danger')
                 return redirect(request.url)
             
-            # Add persons to database
-            added_count = 0
-            skipped_count = 0
-            
-            for person_data in persons_data:
-                # Check if person already exists
-                existing = Person.query.filter_by(
-                    course_id=course_id,
-                    email=person_data['email']
-                ).first()
-                
-                if existing:
-                    skipped_count += 1
-                    continue
-                
-                person = Person(
-                    course_id=course_id,
-                    email=person_data['email'],
-                    first_name=person_data['first_name'],
-                    last_name=person_data['last_name'],
-                    role=person_data['role']
-                )
-                
-                db.session.add(person)
-                added_count += 1
+            if rejected:
+                flash(f'{len(rejected)} rows were rejected.', 'warning')
+                for row in rejected[:5]:  # Show first 5 rejected rows
+                    flash(f'Row {row["row"]} ({row["email"] or "no email"}): {row["reason"]}', 'warning')
             
+            # Add persons to database
             try:
+                results = import_persons(course_id, persons_data, update_existing=update_existing)
                 db.session.commit()
-                flash(f'Successfully added {added_count} persons. Skipped {skipped_count} duplicates.', 'success')
+                flash(f'Successfully added {results["added"]} persons. Updated {results["updated"]}. '
+                      f'Skipped {results["skipped"]} duplicates.', 'success')
                 return redirect(url_for('course_detail', course_id=course_id))
             except Exception as e:
                 db.session.rollback()
                 flash(f'Error saving persons: {str(e)}', 'danger')
     
-    return render_template('admin/upload_persons.html', course=course)
+    # Imports that stopped part-way; only failed or stalled ones can be resumed
+    unfinished_imports = PersonImport.query.filter(
+        PersonImport.course_id == course_id,
+        PersonImport.status != 'COMPLETED'
+    ).order_by(PersonImport.created_at.desc()).all()
+    resumable_ids = {import_id for (import_id,) in db.session.query(PersonImport.id).filter(
+        PersonImport.course_id == course_id,
+        resumable_import_condition()
+    )}
+    
+    return render_template('admin/upload_persons.html', course=course, unfinished_imports=unfinished_imports,
+                           resumable_ids=resumable_ids)
+
+
+@app.route('/admin/import/<int:import_id>/resume', methods=['POST'])
+@login_required
+def resume_person_import(import_id):
+    """Resume a chunked import from its last committed chunk"""
+    person_import = PersonImport.query.get_or_404(import_id)
+    
+    if person_import.status == 'COMPLETED':
+        flash('This import has already completed.', 'info')
+        return redirect(url_for('course_detail', course_id=person_import.course_id))
+    
+    return finish_person_import(person_import)
+
+
+def finish_person_import(person_import):
+    """Run a chunked import and report its outcome"""
+    rejected = run_person_import(person_import)
+    
+    if rejected is None:
+        flash('This import is already running.', 'info')
+        return redirect(url_for('upload_persons', course_id=person_import.course_id))
+    
+    if rejected:
+        flash(f'{person_import.rejected_count} rows were rejected.', 'warning')
+        for row in rejected:
+            flash(f'Row {row["row"]} ({row["email"] or "no email"}): {row["reason"]}', 'warning')
+    
+    if person_import.status != 'COMPLETED':
+        flash(f'Import stopped after {person_import.rows_processed} rows: {person_import.error}. '
+              f'You can resume it from the upload page.', 'danger')
+        return redirect(url_for('upload_persons', course_id=person_import.course_id))
+    
+    flash(f'Successfully added {person_import.added_count} persons. Updated {person_import.updated_count}. '
+          f'Skipped {person_import.skipped_count} duplicates.', 'success')
+    return redirect(url_for('course_detail', course_id=person_import.course_id))
 
 
 @app.route('/admin/course/<int:course_id>/add-person', methods=['GET', 'POST'])
@@ -312,8 +397,11 @@ def add_person(course_id):
     if request.method == 'POST':
         email = request.form.get('email')
         
-        # Check if person already exists
-        existing = Person.query.filter_by(course_id=course_id, email=email).first()
+        # Check if person already exists (emails are unique per course, ignoring case)
+        existing = Person.query.filter(
+            Person.course_id == course_id,
+            db.func.lower(Person.email) == email.lower()
+        ).first()
         if existing:
             flash(f'Person with email {email} already exists in this course.', 'warning')
             return redirect(request.url)
@@ -347,8 +435,20 @@ def edit_person(person_id):
     person = Person.query.get_or_404(person_id)
     
     if request.method == 'POST':
+        email = request.form.get('email')
+        
+        # Emails are unique per course, ignoring case
+        existing = Person.query.filter(
+            Person.course_id == person.course_id,
+            Person.id != person.id,
+            db.func.lower(Person.email) == email.lower()
+        ).first()
+        if existing:
+            flash(f'Person with email {email} already exists in this course.', 'warning')
+            return redirect(request.url)
+        
         try:
-            person.email = request.form.get('email')
+            person.email = email
             person.first_name = request.form.get('first_name')
             person.last_name = request.form.get('last_name')
             person.role = request.form.get('role')
@@ -373,8 +473,10 @@ def delete_person(person_id):
     course_id = person.course_id
     
     try:
+        removable = release_uploaded_files(person.files)
         db.session.delete(person)
         db.session.commit()
+        remove_stored_files(removable)
         flash('Person deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -418,16 +520,16 @@ def send_rsvp_emails(course_id):
         flash('No persons to send RSVP emails to.', 'warning')
         return redirect(url_for('course_detail', course_id=course_id))
     
-    results = send_bulk_rsvp_emails(persons, course)
-    
-    flash(f'RSVP emails sent: {results["success"]} successful, {results["failed"]} failed.', 
-          'success' if results['failed'] == 0 else 'warning')
+    try:
+        batch = enqueue_bulk_emails('rsvp', persons, course)
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error queuing rsvp emails: {str(e)}', 'danger')
+        return redirect(url_for('course_detail', course_id=course_id))
     
-    if results['errors']:
-        for error in results['errors'][:5]:  # Show first 5 errors
-            flash(error, 'danger')
+    flash(f'RSVP emails queued: {batch.total} emails are being sent (batch #{batch.id}).', 'success')
     
-    return redirect(url_for('course_detail', course_id=course_id))
+    return redirect(url_for('course_detail', course_id=course_id, email_batch=batch.id))
 
 
 @app.route('/admin/course/<int:course_id>/send-info-forms', methods=['POST'])
@@ -447,16 +549,16 @@ def send_info_forms(course_id):
         flash('No persons to send info forms to.', 'warning')
         return redirect(url_for('course_detail', course_id=course_id))
     
-    results = send_bulk_info_form_emails(persons, course)
-    
-    flash(f'Info form emails sent: {results["success"]} successful, {results["failed"]} failed.', 
-          'success' if results['failed'] == 0 else 'warning')
+    try:
+        batch = enqueue_bulk_emails('info_form', persons, course)
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error queuing info form emails: {str(e)}', 'danger')
+        return redirect(url_for('course_detail', course_id=course_id))
     
-    if results['errors']:
-        for error in results['errors'][:5]:
-            flash(error, 'danger')
+    flash(f'Info form emails queued: {batch.total} emails are being sent (batch #{batch.id}).', 'success')
     
-    return redirect(url_for('course_detail', course_id=course_id))
+    return redirect(url_for('course_detail', course_id=course_id, email_batch=batch.id))
 
 
 @app.route('/admin/course/<int:course_id>/send-hotel-requests', methods=['POST'])
@@ -481,16 +583,16 @@ def send_hotel_requests(course_id):
         flash('No persons to send hotel requests to.', 'warning')
         return redirect(url_for('course_detail', course_id=course_id))
     
-    results = send_bulk_hotel_request_emails(persons_to_email, course)
-    
-    flash(f'Hotel request emails sent: {results["success"]} successful, {results["failed"]} failed.', 
-          'success' if results['failed'] == 0 else 'warning')
+    try:
+        batch = enqueue_bulk_emails('hotel_request', persons_to_email, course)
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Error queuing hotel request emails: {str(e)}', 'danger')
+        return redirect(url_for('course_detail', course_id=course_id))
     
-    if results['errors']:
-        for error in results['errors'][:5]:
-            flash(error, 'danger')
+    flash(f'Hotel request emails queued: {batch.total} emails are being sent (batch #{batch.id}).', 'success')
     
-    return redirect(url_for('course_detail', course_id=course_id))
+    return redirect(url_for('course_detail', course_id=course_id, email_batch=batch.id))
 
 
 @app.route('/admin/course/<int:course_id>/process-info-reminders', methods=['POST'])
@@ -554,6 +656,7 @@ def manage_questions(course_id):
             )
             
             db.session.add(question)
+            bump_questions_version(course_id)
             db.session.commit()
             
             flash('Question added successfully!', 'success')
@@ -577,6 +680,7 @@ def edit_question(question_id):
         question.field_type = request.form.get('field_type')
         question.required = request.form.get('required') == 'on'
         
+        bump_questions_version(question.course_id)
         db.session.commit()
         flash('Question updated successfully!', 'success')
     except Exception as e:
@@ -595,6 +699,7 @@ def delete_question(question_id):
     
     try:
         db.session.delete(question)
+        bump_questions_version(course_id)
         db.session.commit()
         flash('Question deleted successfully!', 'success')
     except Exception as e:
@@ -629,6 +734,7 @@ def move_question(question_id, direction):
             if next_question:
                 question.order, next_question.order = next_question.order, question.order
         
+        bump_questions_version(question.course_id)
         db.session.commit()
         flash('Question order updated!', 'success')
     except Exception as e:
@@ -645,28 +751,64 @@ def move_question(question_id, direction):
 @app.route('/admin/course/<int:course_id>/export')
 @login_required
 def export_course_data(course_id):
-    """Export course data to Excel"""
+    """Queue a background Excel export of course data"""
     course = Course.query.get_or_404(course_id)
     
     role_filter = request.args.get('role')  # Can be 'PARTICIPANT', 'FACULTY', or None for all
     
     try:
-        output = export_to_excel(course, role_filter)
-        
-        filename = f"{course.name.replace(' ', '_')}"
-        if role_filter:
-            filename += f"_{role_filter}"
-        filename += f"_{datetime.now().strftime('%Y%m%d')}.xlsx"
-        
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
+        job = submit_export(course, role_filter)
     except Exception as e:
+        db.session.rollback()
         flash(f'Error exporting data: {str(e)}', 'danger')
         return redirect(url_for('course_detail', course_id=course_id))
+    
+    # Unchanged course data reuses the cached export
+    if job.status == 'COMPLETED':
+        return redirect(url_for('download_export', job_id=job.id))
+    
+    return render_template('admin/export_status.html', course=course, job=job)
+
+
+@app.route('/admin/exports/<job_id>/status')
+@login_required
+def export_status(job_id):
+    """Get export job status as JSON"""
+    job = ExportJob.query.get_or_404(job_id)
+    
+    # Picks the job back up if the worker building it went away
+    requeue_stale_export(job)
+    
+    return jsonify({
+        'id': job.id,
+        'status': job.status,
+        'error': job.error,
+        'download_url': url_for('download_export', job_id=job.id) if job.status == 'COMPLETED' else None
+    })
+
+
+@app.route('/admin/exports/<job_id>/download')
+@login_required
+def download_export(job_id):
+    """Download a finished export"""
+    job = ExportJob.query.get_or_404(job_id)
+    filepath = get_artifact_path(job)
+    
+    if job.status != 'COMPLETED' or not os.path.exists(filepath):
+        flash('Export file not available. Please export again.', 'danger')
+        return redirect(url_for('course_detail', course_id=job.course_id))
+    
+    filename = f"{job.course.name.replace(' ', '_')}"
+    if job.role_filter:
+        filename += f"_{job.role_filter}"
+    filename += f"_{job.completed_at.strftime('%Y%m%d')}.xlsx"
+    
+    return send_file(
+        filepath,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        as_attachment=True,
+        download_name=filename
+    )
 
 
 # ============================================
@@ -694,6 +836,7 @@ def edit_email_template(template_id):
             template.updated_at = datetime.utcnow()
             
             db.session.commit()
+            invalidate_email_template(template.template_name)
             flash('Email template updated successfully!', 'success')
             return redirect(url_for('email_templates'))
         
@@ -714,7 +857,7 @@ def download_file(file_id):
     """Download uploaded file"""
     file = UploadedFile.query.get_or_404(file_id)
     
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
+    filepath = stored_file_path(file.filename)
     
     if not os.path.exists(filepath):
         flash('File not found.', 'danger')
@@ -731,14 +874,11 @@ def delete_file(file_id):
     person_id = file.person_id
     
     try:
-        # Delete physical file
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], file.filename)
-        if os.path.exists(filepath):
-            os.remove(filepath)
-        
-        # Delete database record
+        # Delete database record; the stored file goes once nothing else references it
+        removable = release_uploaded_files([file])
         db.session.delete(file)
         db.session.commit()
+        remove_stored_files(removable)
         
         flash('File deleted successfully!', 'success')
     except Exception as e:
@@ -798,40 +938,52 @@ def info_form(token):
     if person.status != 'ATTENDING':
         return render_template('public/not_attending.html', person=person, course=course)
     
-    # Get custom questions
-    questions = CustomQuestion.query.filter_by(course_id=course.id).order_by(CustomQuestion.order).all()
+    # Get custom questions (cached per course)
+    questions = get_course_questions(course)
+    
+    # Existing answers by question, loaded once for both the form and the save
+    answers = {answer.question_id: answer for answer in Answer.query.filter_by(person_id=person.id)}
     
     if request.method == 'POST':
         try:
+            now = datetime.utcnow()
+            
             # Update basic info
             person.first_name = request.form.get('first_name')
             person.last_name = request.form.get('last_name')
             
-            # Save answers to custom questions
+            # Collect new and changed answers to custom questions
+            new_answers = []
+            changed_answers = []
             for question in questions:
                 answer_text = request.form.get(f'question_{question.id}')
+                answer = answers.get(question.id)
                 
-                # Check if answer already exists
-                existing_answer = Answer.query.filter_by(
-                    person_id=person.id,
-                    question_id=question.id
-                ).first()
-                
-                if existing_answer:
-                    existing_answer.answer_text = answer_text
-                    existing_answer.updated_at = datetime.utcnow()
-                else:
-                    answer = Answer(
-                        person_id=person.id,
-                        question_id=question.id,
-                        answer_text=answer_text
-                    )
-                    db.session.add(answer)
+                if answer is None:
+                    new_answers.append({
+                        'person_id': person.id,
+                        'question_id': question.id,
+                        'answer_text': answer_text,
+                        'created_at': now,
+                        'updated_at': now
+                    })
+                elif answer.answer_text != answer_text:
+                    changed_answers.append({
+                        'id': answer.id,
+                        'answer_text': answer_text,
+                        'updated_at': now
+                    })
+            
+            # Write them in one bulk INSERT and one bulk UPDATE
+            if new_answers:
+                db.session.execute(Answer.__table__.insert(), new_answers)
+            if changed_answers:
+                db.session.bulk_update_mappings(Answer, changed_answers)
             
             # Mark info as completed
             person.info_completed = True
-            person.info_completed_at = datetime.utcnow()
-            person.updated_at = datetime.utcnow()
+            person.info_completed_at = now
+            person.updated_at = now
             
             db.session.commit()
             
@@ -841,10 +993,7 @@ def info_form(token):
             db.session.rollback()
             flash(f'Error saving information: {str(e)}', 'danger')
     
-    # Get existing answers
-    existing_answers = {}
-    for answer in person.answers:
-        existing_answers[answer.question_id] = answer.answer_text
+    existing_answers = {question_id: answer.answer_text for question_id, answer in answers.items()}
     
     return render_template('public/info_form.html', 
                          person=person, 
@@ -963,6 +1112,8 @@ def file_upload(token):
         
         except Exception as e:
             db.session.rollback()
+            # The blob references went with the rollback; drop blobs nothing else uses
+            remove_stored_files({uploaded_file.filename for uploaded_file in uploaded_files})
             flash(f'Error saving files: {str(e)}', 'danger')
     
     # Get existing files
@@ -994,6 +1145,13 @@ def not_found(error):
     return render_template('errors/404.html'), 404
 
 
+@app.errorhandler(413)
+def file_too_large(error):
+    """413 error handler: oversized uploads go back to the form"""
+    flash(error.description, 'danger')
+    return redirect(request.url)
+
+
 @app.errorhandler(500)
 def internal_error(error):
     """500 error handler"""
@@ -1018,6 +1176,20 @@ def api_course_stats(course_id):
     })
 
 
+@app.route('/api/email-batch/<int:batch_id>/progress')
+@login_required
+def api_email_batch_progress(batch_id):
+    """Get sent/failed counts of a queued bulk send as JSON"""
+    batch = EmailBatch.query.get_or_404(batch_id)
+    progress = get_batch_progress(batch)
+    
+    # Pick the batch back up if the workers that queued it are gone (e.g. restart)
+    if not progress['done'] and not outbox_workers_active():
+        start_outbox_workers()
+    
+    return jsonify(progress)
+
+
 @app.route('/api/person/<int:person_id>/resend-rsvp', methods=['POST'])
 @login_required
 def api_resend_rsvp(person_id):
@@ -1102,47 +1274,111 @@ def utility_processor():
 # SCHEDULED TASKS (Optional - for automation)
 # ============================================
 
-def run_automated_reminders():
+def get_active_course_ids():
+    """IDs of courses that haven't ended yet"""
+    return [course_id for (course_id,) in db.session.query(Course.id).filter(
+        Course.end_date >= datetime.utcnow().date()
+    ).order_by(Course.start_date, Course.id)]
+
+
+def external_url_context():
     """
-    Run automated reminder processing for all active courses
-    This can be called by a scheduler (e.g., APScheduler, cron job)
+    Context for work outside a request whose emails need absolute links
+    A request context for EXTERNAL_SERVER_NAME lets url_for(_external=True) work
+    without setting Flask's SERVER_NAME
     """
-    with app.app_context():
-        courses = Course.query.all()
+    server_name = app.config['EXTERNAL_SERVER_NAME']
+    if not server_name:
+        return app.app_context()
+    return app.test_request_context(base_url=f"{app.config['PREFERRED_URL_SCHEME']}://{server_name}")
+
+
+def process_course_reminders(course_id):
+    """
+    Process info and hotel reminders for one course
+    Runs on a reminder worker thread with its own app context (and so its own DB session)
+    Returns a summary dict for the reminder run table
+    """
+    with external_url_context():
+        started = time.perf_counter()
+        summary = {
+            'course_id': course_id,
+            'course_name': None,
+            'info_sent': 0,
+            'hotel_sent': 0,
+            'final_notices_sent': 0,
+            'errors': 0,
+            'error': None
+        }
         
-        for course in courses:
-            # Only process courses that haven't ended yet
-            if course.end_date >= datetime.utcnow().date():
-                print(f"Processing reminders for course: {course.name}")
-                
-                # Process info reminders
-                info_results = process_info_reminders(course)
-                print(f"  Info reminders: {info_results['reminders_sent']} sent")
-                
-                # Process hotel reminders
-                hotel_results = process_hotel_reminders(course)
-                print(f"  Hotel reminders: {hotel_results['reminders_sent']} sent, "
-                      f"{hotel_results['final_notices_sent']} final notices")
+        try:
+            course = db.session.get(Course, course_id)
+            summary['course_name'] = course.name
+            
+            info_results = process_info_reminders(course)
+            summary['info_sent'] = info_results['reminders_sent']
+            
+            hotel_results = process_hotel_reminders(course)
+            summary['hotel_sent'] = hotel_results['reminders_sent']
+            summary['final_notices_sent'] = hotel_results['final_notices_sent']
+            
+            summary['errors'] = len(info_results['errors']) + len(hotel_results['errors'])
+        
+        except Exception as e:
+            db.session.rollback()
+            summary['error'] = str(e)
+        
+        finally:
+            db.session.remove()
+        
+        summary['seconds'] = time.perf_counter() - started
+        return summary
 
 
-# Optional: Setup APScheduler for automated reminders
-# Uncomment if you want automated daily reminders
-"""
-from apscheduler.schedulers.background import BackgroundScheduler
-import atexit
+def print_reminder_summary(summaries, elapsed):
+    """Print a per-course table of a reminder run"""
+    print(f"{'Course':<40} {'Info':>6} {'Hotel':>6} {'Final':>6} {'Errors':>6} {'Time':>8}")
+    
+    for summary in summaries:
+        name = (summary['course_name'] or f"#{summary['course_id']}")[:40]
+        print(f"{name:<40} {summary['info_sent']:>6} {summary['hotel_sent']:>6} "
+              f"{summary['final_notices_sent']:>6} {summary['errors']:>6} {summary['seconds']:>7.2f}s")
+        if summary['error']:
+            print(f"  ❌ {summary['error']}")
+    
+    print(f"{len(summaries)} courses processed in {elapsed:.2f}s")
 
-scheduler = BackgroundScheduler()
-scheduler.add_job(
-    func=run_automated_reminders,
-    trigger="cron",
-    hour=9,  # Run at 9 AM daily
-    minute=0
-)
-scheduler.start()
 
-# Shut down the scheduler when exiting the app
-atexit.register(lambda: scheduler.shutdown())
-"""
+def run_automated_reminders(concurrency=None):
+    """
+    Run automated reminder processing for all active courses
+    Courses are processed in parallel on up to `concurrency` worker threads
+    This can be called by a scheduler (e.g., APScheduler, cron job)
+    Returns the per-course summaries
+    """
+    concurrency = concurrency or app.config['REMINDER_CONCURRENCY']
+    started = time.perf_counter()
+    
+    with app.app_context():
+        course_ids = get_active_course_ids()
+    
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='reminders') as executor:
+        summaries = list(executor.map(process_course_reminders, course_ids))
+    
+    print_reminder_summary(summaries, time.perf_counter() - started)
+    
+    return summaries
+
+
+# Automated daily reminders, run by one worker per tick (see scheduler.py)
+# Enable with SCHEDULER_ENABLED=true
+if app.config['SCHEDULER_ENABLED']:
+    start_scheduler(app, [{
+        'name': 'reminders',
+        'func': run_automated_reminders,
+        'hour': app.config['REMINDER_SCHEDULE_HOUR'],
+        'minute': app.config['REMINDER_SCHEDULE_MINUTE'],
+    }])
 
 
 # ============================================
@@ -1151,10 +1387,64 @@ atexit.register(lambda: scheduler.shutdown())
 
 @app.cli.command('init-db')
 def init_db_command():
-    """Initialize the database and create default templates"""
-    db.create_all()
-    initialize_default_email_templates()
-    print('✅ Database initialized successfully!')
+    """Create/upgrade the database schema and default templates (run on each release)"""
+    try:
+        changes = bootstrap_database()
+    except ValueError as e:
+        print(f'❌ {e}')
+        # Non-zero exit so a release step fails instead of shipping an outdated schema
+        raise SystemExit(1)
+    
+    for column_name in changes['columns']:
+        print(f'✅ Added column {column_name}')
+    for index_name in changes['indexes']:
+        print(f'✅ Created index {index_name}')
+    print(f'✅ Database initialized successfully! (schema version {SCHEMA_VERSION})')
+
+
+@app.cli.command('check-indexes')
+def check_indexes_command():
+    """EXPLAIN the hot Person/Answer queries and report the indexes they use"""
+    all_used = True
+    
+    for description, index_name, used, plan in explain_hot_queries():
+        all_used = all_used and used
+        print(f"{'✅' if used else '❌'} {description}: {'uses' if used else 'does not use'} {index_name}")
+        print(f'   {plan}')
+    
+    if not all_used:
+        print('Run `flask init-db` to create missing indexes.')
+
+
+@app.cli.command('migrate-uploads')
+@click.option('--dry-run', is_flag=True, help='Only list the uploads that would be moved')
+def migrate_uploads_command(dry_run):
+    """Move uploads stored before the blob layout into it, verifying checksums"""
+    legacy_files = UploadedFile.query.filter(
+        ~UploadedFile.filename.startswith(BLOB_DIRECTORY + '/')
+    ).order_by(UploadedFile.id).all()
+    print(f'{len(legacy_files)} uploads outside the blob store')
+    
+    if dry_run:
+        for uploaded_file in legacy_files:
+            print(f'   {uploaded_file.id}: {uploaded_file.filename}')
+        return
+    
+    outcomes = Counter()
+    for uploaded_file in legacy_files:
+        file_id, filename = uploaded_file.id, uploaded_file.filename
+        try:
+            outcome = migrate_legacy_upload(uploaded_file)
+        except Exception as e:
+            db.session.rollback()
+            outcome = f'error: {e}'
+        
+        outcomes[outcome.split(':')[0]] += 1
+        if outcome not in ('migrated', 'deduplicated'):
+            print(f'❌ File {file_id} ({filename}): {outcome}')
+    
+    print(f"✅ Migrated {outcomes['migrated']}, deduplicated {outcomes['deduplicated']}; "
+          f"{outcomes['missing']} missing, {outcomes['mismatch']} checksum mismatches, {outcomes['error']} errors")
 
 
 @app.cli.command('create-admin')
@@ -1186,12 +1476,21 @@ def create_admin_command():
 
 
 @app.cli.command('run-reminders')
-def run_reminders_command():
+@click.option('--concurrency', type=int, default=None,
+              help='Courses processed in parallel (default: REMINDER_CONCURRENCY)')
+def run_reminders_command(concurrency):
     """Manually run reminder processing for all courses"""
-    run_automated_reminders()
+    run_automated_reminders(concurrency)
     print('✅ Reminder processing completed!')
 
 
+@app.cli.command('send-outbox')
+def send_outbox_command():
+    """Send all queued outbox emails in this process, waiting out retry delays"""
+    handled = drain_outbox()
+    print(f'✅ Outbox drained: {handled} emails processed')
+
+
 @app.cli.command('test-email')
 def test_email_command():
     """Test email configuration"""
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check
+Profiles `import app` (what every gunicorn worker does on boot) with
+`python -X importtime` in a fresh interpreter and fails if it loads modules
+that only the roster import and Excel export paths need.
+
+Usage: python check_imports.py
+"""
+
+import os
+import subprocess
+import sys
+
+# Heavy modules that must only load when an import/export actually runs
+LAZY_MODULES = ['pandas', 'numpy', 'openpyxl']
+
+
+def profile_app_import():
+    """
+    Import app in a fresh interpreter with -X importtime
+    Returns list of (module, cumulative microseconds, nesting level)
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True
+    )
+    
+    if result.returncode != 0:
+        raise RuntimeError(f"`import app` failed:\n{result.stderr[-2000:]}")
+    
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        
+        _, cumulative, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(cumulative), level))
+    
+    return modules
+
+
+def main():
+    print("=" * 50)
+    print("Worker boot import budget")
+    print("=" * 50)
+    
+    try:
+        modules = profile_app_import()
+    except RuntimeError as e:
+        print(f"✗ {e}")
+        return 1
+    
+    total = next(cumulative for name, cumulative, level in modules if name == 'app')
+    print(f"import app: {total / 1000:.0f} ms")
+    
+    # Slowest direct imports of app.py
+    direct = sorted((module for module in modules if module[2] == 1), key=lambda module: -module[1])
+    for name, cumulative, _ in direct[:10]:
+        print(f"  {cumulative / 1000:7.1f} ms  {name}")
+    
+    offenders = sorted({name.split('.')[0] for name, _, _ in modules} & set(LAZY_MODULES))
+    if offenders:
+        print(f"\n✗ Worker boot imports modules that should load lazily: {', '.join(offenders)}")
+        return 1
+    
+    print(f"\n✓ None of {', '.join(LAZY_MODULES)} loaded at boot")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -30,10 +30,21 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER') or 'noreply@example.com'
+    MAIL_MAX_EMAILS = int(os.environ.get('MAIL_MAX_EMAILS') or 100)  # Messages per SMTP connection in bulk sends
+    
+    # Outbox (queued bulk email) settings
+    OUTBOX_WORKERS = int(os.environ.get('OUTBOX_WORKERS') or 4)  # Sender threads per process
+    OUTBOX_CLAIM_SIZE = 25  # Emails a worker claims at a time
+    OUTBOX_MAX_ATTEMPTS = 3  # Sends tried before an email is marked FAILED
+    OUTBOX_RETRY_DELAY_SECONDS = 60  # Wait before retrying a failed send
+    OUTBOX_CLAIM_TIMEOUT_MINUTES = 15  # Claims older than this are released (worker died)
+    OUTBOX_POLL_SECONDS = 5  # How often a worker re-checks emails waiting on a retry or another worker
     
     # File upload configuration
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
-    MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50 MB max file size
+    MAX_CONTENT_LENGTH = 50 * 1024 * 1024  # 50 MB max request size
+    MAX_UPLOAD_FILE_SIZE = int(os.environ.get('MAX_UPLOAD_FILE_SIZE') or 50 * 1024 * 1024)  # Per file, enforced while streaming
+    UPLOAD_CHUNK_SIZE = 64 * 1024  # Bytes read and hashed at a time when copying uploads
     ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'jpg', 'jpeg', 'png'}
     
     # Session configuration
@@ -44,10 +55,45 @@ class Config:
     
     # Application settings
     ITEMS_PER_PAGE = 20
+    AUTO_INIT_DB = os.environ.get('AUTO_INIT_DB', 'false').lower() in ['true', 'on', '1']  # Bootstrap on worker startup (single-process setups only; `flask init-db` is the release step)
+    # Host for email links built outside a request (reminder runs), e.g. courses.example.org.
+    # Deliberately not Flask's SERVER_NAME, which would also 404 requests on any other hostname
+    EXTERNAL_SERVER_NAME = os.environ.get('EXTERNAL_SERVER_NAME')
+    PREFERRED_URL_SCHEME = os.environ.get('PREFERRED_URL_SCHEME') or 'https'
+    
+    # Import settings
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE') or 500)  # Persons per bulk INSERT/UPDATE
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE') or 5000)  # Rows per committed chunk
+    IMPORT_STREAM_THRESHOLD = 1024 * 1024  # Files larger than this (bytes) are imported in chunks
+    IMPORT_STALE_MINUTES = 10  # RUNNING imports with no committed chunk for this long can be resumed
+    ROSTER_EXTENSIONS = {'csv', 'xlsx', 'xls'}
+    IMPORT_FOLDER = os.environ.get('IMPORT_FOLDER') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'imports')
+    
+    # Export settings
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE') or 1000)  # Persons per streamed chunk
+    EXPORT_WIDTH_SAMPLE_ROWS = 100  # Rows sampled to estimate column widths
+    EXPORT_FOLDER = os.environ.get('EXPORT_FOLDER') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exports')
+    EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS') or 2)  # Background export threads per process
+    EXPORT_JOB_STALE_SECONDS = 120  # Unfinished jobs with no progress for this long are requeued
     
     # Email settings
     SEND_EMAIL = os.environ.get('SEND_EMAIL', 'true').lower() in ['true', 'on', '1']
     
+    # Reminder settings
+    REMINDER_INTERVAL_DAYS = int(os.environ.get('REMINDER_INTERVAL_DAYS') or 3)  # Days between reminders
+    MAX_INFO_REMINDERS = int(os.environ.get('MAX_INFO_REMINDERS') or 4)  # Info form reminders per person
+    MAX_HOTEL_REMINDERS = int(os.environ.get('MAX_HOTEL_REMINDERS') or 4)  # Hotel reminders before the final notice
+    REMINDER_CHUNK_SIZE = 100  # Reminders recorded per transaction
+    REMINDER_CONCURRENCY = int(os.environ.get('REMINDER_CONCURRENCY') or 4)  # Courses processed in parallel
+    
+    # Scheduler settings (automated daily reminders)
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'false').lower() in ['true', 'on', '1']
+    REMINDER_SCHEDULE_HOUR = int(os.environ.get('REMINDER_SCHEDULE_HOUR') or 9)  # UTC
+    REMINDER_SCHEDULE_MINUTE = int(os.environ.get('REMINDER_SCHEDULE_MINUTE') or 0)
+    SCHEDULER_POLL_SECONDS = 60  # How often each worker checks for due jobs
+    SCHEDULER_JITTER_SECONDS = 30  # Random delay before a worker tries to take a job's lock
+    SCHEDULER_LEASE_MINUTES = 60  # Lock row expiry, in case the worker holding it dies (non-PostgreSQL)
+    
     # Admin settings
     ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL') or 'admin@example.com'
     
@@ -0,0 +1,250 @@
+"""
+Outbound email queue
+Bulk sends are rendered into the outbox_emails table and drained by a pool of
+sender threads, so admin routes return right away. Workers claim small groups
+of emails with a claim token, which keeps concurrent workers (in this or other
+processes) from sending the same email twice.
+"""
+
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, EmailBatch, OutboxEmail
+from utils import email_template_batch
+from email_service import send_email, shared_mail_connection, render_rsvp_email, \
+    render_info_form_email, render_hotel_request_email
+
+# Batch kind -> function rendering (subject, html_body) for a person
+BULK_EMAIL_RENDERERS = {
+    'rsvp': render_rsvp_email,
+    'info_form': render_info_form_email,
+    'hotel_request': render_hotel_request_email,
+}
+
+_executor = None
+_active_workers = 0
+_workers_lock = threading.Lock()
+
+
+def enqueue_bulk_emails(kind, persons, course):
+    """
+    Render one email per person into the outbox and start the sender workers
+    Returns the EmailBatch tracking the send
+    """
+    renderer = BULK_EMAIL_RENDERERS[kind]
+    
+    batch = EmailBatch(course_id=course.id, kind=kind, total=len(persons))
+    db.session.add(batch)
+    db.session.flush()
+    
+    emails = []
+    with email_template_batch():
+        for person in persons:
+            subject, html_body = renderer(person, course)
+            emails.append({
+                'batch_id': batch.id,
+                'recipient': person.email,
+                'subject': subject,
+                'html_body': html_body
+            })
+    
+    if emails:
+        db.session.execute(OutboxEmail.__table__.insert(), emails)
+    db.session.commit()
+    
+    start_outbox_workers()
+    
+    return batch
+
+
+def start_outbox_workers():
+    """Top the sender pool up to OUTBOX_WORKERS running drain loops"""
+    global _executor, _active_workers
+    
+    app = current_app._get_current_object()
+    
+    with _workers_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config['OUTBOX_WORKERS'],
+                thread_name_prefix='outbox'
+            )
+        
+        while _active_workers < app.config['OUTBOX_WORKERS']:
+            _active_workers += 1
+            _executor.submit(_outbox_worker, app)
+
+
+def outbox_workers_active():
+    """Whether this process has sender workers running"""
+    return _active_workers > 0
+
+
+def _outbox_worker(app):
+    """Thread pool entry point: drain the outbox inside an app context"""
+    global _active_workers
+    
+    with app.app_context():
+        try:
+            drain_outbox()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error draining email outbox: {e}")
+        finally:
+            db.session.remove()
+            with _workers_lock:
+                _active_workers -= 1
+
+
+def drain_outbox():
+    """
+    Send queued emails until every email is SENT or FAILED. Emails waiting
+    out a retry delay, or claimed by another worker, are waited for (checking
+    every OUTBOX_POLL_SECONDS) rather than left behind
+    Returns number of emails handled
+    """
+    handled = 0
+    
+    while True:
+        emails = claim_outbox_emails()
+        if emails is None:
+            next_attempt_at = next_outbox_attempt_at()
+            if next_attempt_at is None:
+                return handled
+            
+            wait = (next_attempt_at - datetime.utcnow()).total_seconds()
+            time.sleep(min(max(wait, 0.1), current_app.config['OUTBOX_POLL_SECONDS']))
+            continue
+        
+        send_claimed_emails(emails)
+        handled += len(emails)
+
+
+def next_outbox_attempt_at():
+    """
+    When the next unfinished email can be claimed: the end of a retry delay,
+    or the claim timeout of an email another worker is sending
+    Returns None when no emails are PENDING or SENDING
+    """
+    config = current_app.config
+    
+    pending_at, sending_at, unclaimed = db.session.query(
+        db.func.min(db.case((OutboxEmail.status == 'PENDING', OutboxEmail.claimed_at))),
+        db.func.min(db.case((OutboxEmail.status == 'SENDING', OutboxEmail.claimed_at))),
+        db.func.count(db.case((db.and_(OutboxEmail.status == 'PENDING', OutboxEmail.claimed_at.is_(None)), 1)))
+    ).filter(OutboxEmail.status.in_(['PENDING', 'SENDING'])).one()
+    db.session.commit()
+    
+    candidates = []
+    if unclaimed:
+        candidates.append(datetime.utcnow())
+    if pending_at is not None:
+        candidates.append(pending_at + timedelta(seconds=config['OUTBOX_RETRY_DELAY_SECONDS']))
+    if sending_at is not None:
+        candidates.append(sending_at + timedelta(minutes=config['OUTBOX_CLAIM_TIMEOUT_MINUTES']))
+    
+    return min(candidates) if candidates else None
+
+
+def claim_outbox_emails():
+    """
+    Claim up to OUTBOX_CLAIM_SIZE pending emails for this worker
+    Returns the claimed emails, [] if another worker won the race,
+    or None when nothing is ready to send
+    """
+    now = datetime.utcnow()
+    config = current_app.config
+    
+    # Release claims left behind by workers that died mid-send
+    stale_before = now - timedelta(minutes=config['OUTBOX_CLAIM_TIMEOUT_MINUTES'])
+    OutboxEmail.query.filter(
+        OutboxEmail.status == 'SENDING',
+        OutboxEmail.claimed_at < stale_before
+    ).update({'status': 'PENDING', 'claim_token': None}, synchronize_session=False)
+    
+    # Emails that failed a send keep their claimed_at and wait out the retry delay
+    retry_before = now - timedelta(seconds=config['OUTBOX_RETRY_DELAY_SECONDS'])
+    ids = [email_id for (email_id,) in db.session.query(OutboxEmail.id).filter(
+        OutboxEmail.status == 'PENDING',
+        db.or_(OutboxEmail.claimed_at.is_(None), OutboxEmail.claimed_at < retry_before)
+    ).order_by(OutboxEmail.id).limit(config['OUTBOX_CLAIM_SIZE'])]
+    
+    if not ids:
+        db.session.commit()
+        return None
+    
+    # Only rows still PENDING are taken, so concurrent claims never overlap
+    claim_token = secrets.token_hex(16)
+    OutboxEmail.query.filter(
+        OutboxEmail.id.in_(ids),
+        OutboxEmail.status == 'PENDING'
+    ).update({
+        'status': 'SENDING',
+        'claim_token': claim_token,
+        'claimed_at': now
+    }, synchronize_session=False)
+    db.session.commit()
+    
+    return OutboxEmail.query.filter_by(claim_token=claim_token).order_by(OutboxEmail.id).all()
+
+
+def send_claimed_emails(emails):
+    """Send claimed emails over one SMTP connection and record the outcomes"""
+    max_attempts = current_app.config['OUTBOX_MAX_ATTEMPTS']
+    sent_ids = []
+    
+    try:
+        with shared_mail_connection():
+            for email in emails:
+                if send_email(email.recipient, email.subject, email.html_body):
+                    sent_ids.append(email.id)
+    except Exception as e:
+        # Connection failures count as a failed attempt for everything not yet sent
+        print(f"Error sending outbox emails: {e}")
+    
+    retry_ids = []
+    failed_ids = []
+    for email in emails:
+        if email.id in sent_ids:
+            continue
+        if email.attempts + 1 < max_attempts:
+            retry_ids.append(email.id)
+        else:
+            failed_ids.append(email.id)
+    
+    now = datetime.utcnow()
+    outcomes = [
+        (sent_ids, {'status': 'SENT', 'sent_at': now}),
+        (retry_ids, {'status': 'PENDING'}),
+        (failed_ids, {'status': 'FAILED', 'error': 'Email send failed'}),
+    ]
+    for ids, values in outcomes:
+        if ids:
+            values.update({'attempts': OutboxEmail.attempts + 1, 'claim_token': None})
+            OutboxEmail.query.filter(OutboxEmail.id.in_(ids)).update(values, synchronize_session=False)
+    db.session.commit()
+
+
+def get_batch_progress(batch):
+    """Return sent/failed/pending counts for an email batch"""
+    counts = dict(db.session.query(
+        OutboxEmail.status,
+        db.func.count(OutboxEmail.id)
+    ).filter(
+        OutboxEmail.batch_id == batch.id
+    ).group_by(OutboxEmail.status).all())
+    
+    pending = counts.get('PENDING', 0) + counts.get('SENDING', 0)
+    
+    return {
+        'batch_id': batch.id,
+        'kind': batch.kind,
+        'total': batch.total,
+        'sent': counts.get('SENT', 0),
+        'failed': counts.get('FAILED', 0),
+        'pending': pending,
+        'done': pending == 0
+    }
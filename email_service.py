@@ -1,11 +1,74 @@
-from flask import url_for
-from flask_mail import Mail, Message
+import smtplib
+from contextlib import contextmanager
+from flask import url_for, g
+from flask_mail import Mail, Message, email_dispatched
 from datetime import datetime
-from utils import render_email_template
+from utils import render_email_template, email_template_batch
 
 mail = Mail()
 
 
+@contextmanager
+def shared_mail_connection():
+    """
+    Send every email inside the block over one SMTP connection
+    The connection is opened by the first send, so a server that can't be
+    reached fails each email on its own instead of the whole block.
+    Flask-Mail reconnects after MAIL_MAX_EMAILS messages; send_email
+    reconnects once if the connection fails mid-batch
+    """
+    # Nested blocks keep using the outer connection
+    if g.get('mail_shared'):
+        yield
+        return
+    
+    g.mail_shared = True
+    g.mail_connection = None
+    try:
+        yield
+    finally:
+        g.mail_shared = False
+        connection = g.pop('mail_connection', None)
+        if connection is not None:
+            _close_mail_connection(connection)
+
+
+def _close_mail_connection(connection):
+    """Quit an SMTP connection, ignoring errors from an already dropped one"""
+    try:
+        connection.__exit__(None, None, None)
+    except (smtplib.SMTPException, OSError):
+        pass
+
+
+def _send_on_shared_connection(msg):
+    """
+    Send on the shared connection, (re)connecting once if it fails
+    A failure after the message went out (Flask-Mail's MAIL_MAX_EMAILS
+    reconnect) only drops the connection; the message is not sent again
+    """
+    dispatched = []
+    
+    def record_dispatch(message, **extra):
+        dispatched.append(message)
+    
+    with email_dispatched.connected_to(record_dispatch):
+        for attempt in range(2):
+            if g.mail_connection is None:
+                g.mail_connection = mail.connect().__enter__()
+            
+            try:
+                g.mail_connection.send(msg)
+                return
+            except (smtplib.SMTPException, OSError):
+                _close_mail_connection(g.mail_connection)
+                g.mail_connection = None
+                if any(message is msg for message in dispatched):
+                    return
+                if attempt:
+                    raise
+
+
 def send_email(recipient, subject, html_body):
     """Send email via Gmail"""
     try:
@@ -14,7 +77,10 @@ def send_email(recipient, subject, html_body):
             recipients=[recipient],
             html=html_body
         )
-        mail.send(msg)
+        if g.get('mail_shared'):
+            _send_on_shared_connection(msg)
+        else:
+            mail.send(msg)
         return True
     except Exception as e:
         print(f"Error sending email to {recipient}: {e}")
@@ -23,6 +89,15 @@ def send_email(recipient, subject, html_body):
 
 def send_rsvp_email(person, course):
     """Send initial RSVP email"""
+    subject, html_body = render_rsvp_email(person, course)
+    return send_email(person.email, subject, html_body)
+
+
+def render_rsvp_email(person, course):
+    """
+    Render initial RSVP email
+    Returns (subject, html_body) tuple
+    """
     yes_link = url_for('rsvp_response', token=person.token, response='yes', _external=True)
     no_link = url_for('rsvp_response', token=person.token, response='no', _external=True)
     
@@ -36,12 +111,20 @@ def send_rsvp_email(person, course):
         'no_link': no_link
     }
     
-    subject, html_body = render_email_template('rsvp_invitation', variables)
-    return send_email(person.email, subject, html_body)
+    return render_email_template('rsvp_invitation', variables)
 
 
 def send_info_form_email(person, course):
     """Send link to info form"""
+    subject, html_body = render_info_form_email(person, course)
+    return send_email(person.email, subject, html_body)
+
+
+def render_info_form_email(person, course):
+    """
+    Render info form link email
+    Returns (subject, html_body) tuple
+    """
     form_link = url_for('info_form', token=person.token, _external=True)
     
     variables = {
@@ -51,8 +134,7 @@ def send_info_form_email(person, course):
         'form_link': form_link
     }
     
-    subject, html_body = render_email_template('info_form_request', variables)
-    return send_email(person.email, subject, html_body)
+    return render_email_template('info_form_request', variables)
 
 
 def send_info_reminder_email(person, course, reminder_number):
@@ -73,6 +155,15 @@ def send_info_reminder_email(person, course, reminder_number):
 
 def send_hotel_request_email(person, course):
     """Send hotel request form link"""
+    subject, html_body = render_hotel_request_email(person, course)
+    return send_email(person.email, subject, html_body)
+
+
+def render_hotel_request_email(person, course):
+    """
+    Render hotel request form link email
+    Returns (subject, html_body) tuple
+    """
     hotel_link = url_for('hotel_form', token=person.token, _external=True)
     
     variables = {
@@ -85,8 +176,7 @@ def send_hotel_request_email(person, course):
         'night3_date': course.hotel_night3.strftime('%B %d, %Y') if course.hotel_night3 else 'TBD'
     }
     
-    subject, html_body = render_email_template('hotel_request', variables)
-    return send_email(person.email, subject, html_body)
+    return render_email_template('hotel_request', variables)
 
 
 def send_hotel_reminder_email(person, course, reminder_number):
@@ -160,63 +250,11 @@ def send_file_upload_notification(person, files, admin_email):
     return send_email(admin_email, subject, html_body)
 
 
-def send_bulk_rsvp_emails(persons, course):
-    """Send RSVP emails to multiple persons"""
-    results = {'success': 0, 'failed': 0, 'errors': []}
-    
-    for person in persons:
-        try:
-            if send_rsvp_email(person, course):
-                results['success'] += 1
-            else:
-                results['failed'] += 1
-                results['errors'].append(f"{person.email}: Email send failed")
-        except Exception as e:
-            results['failed'] += 1
-            results['errors'].append(f"{person.email}: {str(e)}")
-    
-    return results
-
-
-def send_bulk_info_form_emails(persons, course):
-    """Send info form emails to multiple persons"""
-    results = {'success': 0, 'failed': 0, 'errors': []}
-    
-    for person in persons:
-        try:
-            if send_info_form_email(person, course):
-                results['success'] += 1
-            else:
-                results['failed'] += 1
-                results['errors'].append(f"{person.email}: Email send failed")
-        except Exception as e:
-            results['failed'] += 1
-            results['errors'].append(f"{person.email}: {str(e)}")
-    
-    return results
-
-
-def send_bulk_hotel_request_emails(persons, course):
-    """Send hotel request emails to multiple persons"""
-    results = {'success': 0, 'failed': 0, 'errors': []}
-    
-    for person in persons:
-        try:
-            if send_hotel_request_email(person, course):
-                results['success'] += 1
-            else:
-                results['failed'] += 1
-                results['errors'].append(f"{person.email}: Email send failed")
-        except Exception as e:
-            results['failed'] += 1
-            results['errors'].append(f"{person.email}: {str(e)}")
-    
-    return results
-
-
 def process_info_reminders(course):
     """
     Process and send info form reminders for persons who haven't completed
+    Eligibility (interval and max count) is checked in SQL, so only persons
+    with a reminder due are loaded
     Returns dict with reminder statistics
     """
     from models import db, Person
@@ -229,40 +267,74 @@ def process_info_reminders(course):
         'errors': []
     }
     
-    # Get persons who are attending but haven't completed info
-    persons = Person.query.filter_by(
-        course_id=course.id,
-        status='ATTENDING',
-        info_completed=False
-    ).all()
-    
     now = datetime.utcnow()
     reminder_interval = timedelta(days=Config.REMINDER_INTERVAL_DAYS)
     
-    for person in persons:
-        # Check if reminder is due
-        if person.info_last_reminder_sent:
-            time_since_last = now - person.info_last_reminder_sent
-            if time_since_last < reminder_interval:
-                continue  # Not time yet
-        
-        # Check if max reminders reached
-        if person.info_reminder_count >= Config.MAX_INFO_REMINDERS:
-            results['max_reminders_reached'] += 1
-            continue
-        
-        # Send reminder
-        try:
-            reminder_number = person.info_reminder_count + 1
-            if send_info_reminder_email(person, course, reminder_number):
-                person.info_reminder_count = reminder_number
-                person.info_last_reminder_sent = now
+    # Attending persons without completed info whose last reminder is old enough
+    due_filter = [
+        Person.course_id == course.id,
+        Person.status == 'ATTENDING',
+        Person.info_completed.is_(False),
+        db.or_(
+            Person.info_last_reminder_sent.is_(None),
+            Person.info_last_reminder_sent < now - reminder_interval
+        )
+    ]
+    
+    results['max_reminders_reached'] = db.session.query(db.func.count(Person.id)).filter(
+        *due_filter,
+        Person.info_reminder_count >= Config.MAX_INFO_REMINDERS
+    ).scalar()
+    
+    # Previous send times are kept so failed sends can be rolled back
+    due = dict(db.session.query(Person.id, Person.info_last_reminder_sent).filter(
+        *due_filter,
+        Person.info_reminder_count < Config.MAX_INFO_REMINDERS
+    ).order_by(Person.id).all())
+    due_ids = list(due)
+    
+    with email_template_batch():
+        for start in range(0, len(due_ids), Config.REMINDER_CHUNK_SIZE):
+            chunk_ids = due_ids[start:start + Config.REMINDER_CHUNK_SIZE]
+            
+            # Record the chunk's reminders before sending. A crash mid-chunk then
+            # can't lead to a second send, and the due filter keeps the claim
+            # from being applied twice
+            Person.query.filter(
+                Person.id.in_(chunk_ids),
+                *due_filter,
+                Person.info_reminder_count < Config.MAX_INFO_REMINDERS
+            ).update({
+                'info_reminder_count': Person.info_reminder_count + 1,
+                'info_last_reminder_sent': now
+            }, synchronize_session=False)
+            db.session.commit()
+            
+            persons = Person.query.filter(
+                Person.id.in_(chunk_ids),
+                Person.info_last_reminder_sent == now
+            ).order_by(Person.id).all()
+            
+            rollbacks = []
+            for person in persons:
+                reminder_number = person.info_reminder_count
+                try:
+                    if send_info_reminder_email(person, course, reminder_number):
+                        results['reminders_sent'] += 1
+                        continue
+                    results['errors'].append(f"{person.email}: Failed to send")
+                except Exception as e:
+                    results['errors'].append(f"{person.email}: {str(e)}")
+                
+                rollbacks.append({
+                    'id': person.id,
+                    'info_reminder_count': reminder_number - 1,
+                    'info_last_reminder_sent': due[person.id]
+                })
+            
+            if rollbacks:
+                db.session.bulk_update_mappings(Person, rollbacks)
                 db.session.commit()
-                results['reminders_sent'] += 1
-            else:
-                results['errors'].append(f"{person.email}: Failed to send")
-        except Exception as e:
-            results['errors'].append(f"{person.email}: {str(e)}")
     
     return results
 
@@ -270,6 +342,7 @@ def process_info_reminders(course):
 def process_hotel_reminders(course):
     """
     Process and send hotel request reminders
+    Persons with a reminder or final notice due are selected in one SQL query
     Returns dict with reminder statistics
     """
     from models import db, Person, HotelRequest
@@ -282,56 +355,97 @@ def process_hotel_reminders(course):
         'errors': []
     }
     
-    # Get persons who are attending but haven't completed hotel request
-    persons = Person.query.filter_by(
-        course_id=course.id,
-        status='ATTENDING'
-    ).all()
-    
     now = datetime.utcnow()
     reminder_interval = timedelta(days=Config.REMINDER_INTERVAL_DAYS)
     
-    for person in persons:
-        # Check if hotel request exists and is not completed
-        hotel = person.hotel_request
-        
-        if not hotel or hotel.completed:
-            continue
-        
-        # Check if final notice already sent
-        if hotel.final_notice_sent:
-            continue
-        
-        # Check if reminder is due
-        if hotel.last_reminder_sent:
-            time_since_last = now - hotel.last_reminder_sent
-            if time_since_last < reminder_interval:
-                continue  # Not time yet
-        
-        # Check if max reminders reached - send final notice
-        if hotel.reminder_count >= Config.MAX_HOTEL_REMINDERS:
-            try:
-                if send_hotel_final_notice_email(person, course):
-                    hotel.final_notice_sent = True
-                    db.session.commit()
-                    results['final_notices_sent'] += 1
-                else:
-                    results['errors'].append(f"{person.email}: Failed to send final notice")
-            except Exception as e:
-                results['errors'].append(f"{person.email}: {str(e)}")
-            continue
-        
-        # Send reminder
-        try:
-            reminder_number = hotel.reminder_count + 1
-            if send_hotel_reminder_email(person, course, reminder_number):
-                hotel.reminder_count = reminder_number
-                hotel.last_reminder_sent = now
+    # Open hotel requests with no final notice yet whose last reminder is old enough
+    due_filter = [
+        HotelRequest.completed.isnot(True),
+        HotelRequest.final_notice_sent.isnot(True),
+        db.or_(
+            HotelRequest.last_reminder_sent.is_(None),
+            HotelRequest.last_reminder_sent < now - reminder_interval
+        )
+    ]
+    
+    # Previous send times are kept so failed sends can be rolled back
+    due = dict(db.session.query(HotelRequest.id, HotelRequest.last_reminder_sent).join(
+        Person, Person.id == HotelRequest.person_id
+    ).filter(
+        Person.course_id == course.id,
+        Person.status == 'ATTENDING',
+        *due_filter
+    ).order_by(Person.id).all())
+    due_ids = list(due)
+    
+    with email_template_batch():
+        for start in range(0, len(due_ids), Config.REMINDER_CHUNK_SIZE):
+            chunk_ids = due_ids[start:start + Config.REMINDER_CHUNK_SIZE]
+            
+            # Record the chunk's reminders and final notices before sending (see
+            # process_info_reminders); last_reminder_sent marks this run's claim
+            HotelRequest.query.filter(
+                HotelRequest.id.in_(chunk_ids),
+                *due_filter,
+                HotelRequest.reminder_count < Config.MAX_HOTEL_REMINDERS
+            ).update({
+                'reminder_count': HotelRequest.reminder_count + 1,
+                'last_reminder_sent': now
+            }, synchronize_session=False)
+            HotelRequest.query.filter(
+                HotelRequest.id.in_(chunk_ids),
+                *due_filter,
+                HotelRequest.reminder_count >= Config.MAX_HOTEL_REMINDERS
+            ).update({
+                'final_notice_sent': True,
+                'last_reminder_sent': now
+            }, synchronize_session=False)
+            db.session.commit()
+            
+            claimed = db.session.query(Person, HotelRequest).join(
+                HotelRequest, HotelRequest.person_id == Person.id
+            ).filter(
+                HotelRequest.id.in_(chunk_ids),
+                HotelRequest.last_reminder_sent == now
+            ).order_by(Person.id).all()
+            
+            rollbacks = []
+            for person, hotel in claimed:
+                # Max reminders reached - send final notice
+                if hotel.final_notice_sent:
+                    try:
+                        if send_hotel_final_notice_email(person, course):
+                            results['final_notices_sent'] += 1
+                            continue
+                        results['errors'].append(f"{person.email}: Failed to send final notice")
+                    except Exception as e:
+                        results['errors'].append(f"{person.email}: {str(e)}")
+                    
+                    rollbacks.append({
+                        'id': hotel.id,
+                        'final_notice_sent': False,
+                        'last_reminder_sent': due[hotel.id]
+                    })
+                    continue
+                
+                # Send reminder
+                reminder_number = hotel.reminder_count
+                try:
+                    if send_hotel_reminder_email(person, course, reminder_number):
+                        results['reminders_sent'] += 1
+                        continue
+                    results['errors'].append(f"{person.email}: Failed to send reminder")
+                except Exception as e:
+                    results['errors'].append(f"{person.email}: {str(e)}")
+                
+                rollbacks.append({
+                    'id': hotel.id,
+                    'reminder_count': reminder_number - 1,
+                    'last_reminder_sent': due[hotel.id]
+                })
+            
+            if rollbacks:
+                db.session.bulk_update_mappings(HotelRequest, rollbacks)
                 db.session.commit()
-                results['reminders_sent'] += 1
-            else:
-                results['errors'].append(f"{person.email}: Failed to send reminder")
-        except Exception as e:
-            results['errors'].append(f"{person.email}: {str(e)}")
     
     return results
@@ -0,0 +1,255 @@
+"""
+Background export jobs
+Exports are built by a small thread pool into EXPORT_FOLDER and tracked in the
+export_jobs table, so any worker can report status and serve the finished file.
+Requests for unchanged course data reuse the existing job and artifact.
+Running jobs record a heartbeat per chunk; unfinished jobs whose worker went
+away (e.g. the process restarted) are requeued when someone asks for them.
+"""
+
+import os
+import hashlib
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, Person, CustomQuestion, Answer, HotelRequest, UploadedFile, ExportJob
+from utils import export_to_excel_stream
+
+_executor = None
+
+# Jobs queued or running in this process
+_local_job_ids = set()
+_local_jobs_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide export thread pool, creating it on first use"""
+    global _executor
+    
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=current_app.config['EXPORT_WORKERS'],
+            thread_name_prefix='export'
+        )
+    return _executor
+
+
+def course_data_version(course, role_filter=None):
+    """
+    Fingerprint the course data that goes into an export
+    Counts catch deletions, max(updated_at) catches edits
+    """
+    person_filter = [Person.course_id == course.id]
+    if role_filter:
+        person_filter.append(Person.role == role_filter)
+    
+    parts = [course.id, role_filter, course.updated_at]
+    
+    parts.extend(db.session.query(
+        db.func.count(Person.id),
+        db.func.max(Person.updated_at)
+    ).filter(*person_filter).one())
+    
+    for model, changed in ((Answer, Answer.updated_at),
+                           (HotelRequest, HotelRequest.updated_at),
+                           (UploadedFile, UploadedFile.id)):
+        parts.extend(db.session.query(
+            db.func.count(model.id),
+            db.func.max(changed)
+        ).join(
+            Person, Person.id == model.person_id
+        ).filter(*person_filter).one())
+    
+    # Questions have no updated_at, so hash their labels and order directly
+    parts.extend(db.session.query(
+        CustomQuestion.id,
+        CustomQuestion.label,
+        CustomQuestion.order
+    ).filter_by(course_id=course.id).order_by(CustomQuestion.id).all())
+    
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def get_artifact_path(job):
+    """Full path of a job's export file"""
+    return os.path.join(current_app.config['EXPORT_FOLDER'], job.filename)
+
+
+def submit_export(course, role_filter=None):
+    """
+    Queue an export of the course data and return its ExportJob
+    Returns the existing job if one for the same data is finished or in progress
+    """
+    data_version = course_data_version(course, role_filter)
+    
+    job = ExportJob.query.filter_by(
+        course_id=course.id,
+        role_filter=role_filter,
+        data_version=data_version
+    ).filter(
+        ExportJob.status != 'FAILED'
+    ).order_by(ExportJob.created_at.desc()).first()
+    
+    if job:
+        if job.status == 'COMPLETED' and os.path.exists(get_artifact_path(job)):
+            return job
+        
+        if job.status != 'COMPLETED':
+            requeue_stale_export(job)
+            return job
+    
+    job = ExportJob(
+        course_id=course.id,
+        role_filter=role_filter,
+        data_version=data_version
+    )
+    job.filename = f"course{course.id}_{role_filter or 'ALL'}_{data_version[:16]}.xlsx"
+    db.session.add(job)
+    db.session.commit()
+    
+    _queue_export(job.id)
+    
+    return job
+
+
+def _queue_export(job_id):
+    """Run a job on this process's export pool"""
+    with _local_jobs_lock:
+        _local_job_ids.add(job_id)
+    get_executor().submit(run_export_job, current_app._get_current_object(), job_id)
+
+
+def export_is_stale(job):
+    """Whether an unfinished job has made no progress for EXPORT_JOB_STALE_SECONDS"""
+    if job.status not in ('PENDING', 'RUNNING') or job.id in _local_job_ids:
+        return False
+    
+    last_progress = job.heartbeat_at or job.created_at
+    stale_after = timedelta(seconds=current_app.config['EXPORT_JOB_STALE_SECONDS'])
+    return datetime.utcnow() - last_progress > stale_after
+
+
+def requeue_stale_export(job):
+    """
+    Requeue an unfinished job on this process if its worker went away
+    Returns True if the job was requeued
+    """
+    if not export_is_stale(job):
+        return False
+    
+    # Only one request may requeue it: the heartbeat it read must still be current
+    if job.heartbeat_at is None:
+        unchanged = ExportJob.heartbeat_at.is_(None)
+    else:
+        unchanged = ExportJob.heartbeat_at == job.heartbeat_at
+    
+    requeued = ExportJob.query.filter(
+        ExportJob.id == job.id,
+        ExportJob.status == job.status,
+        unchanged
+    ).update({
+        'status': 'PENDING',
+        'heartbeat_at': datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+    
+    if requeued:
+        db.session.refresh(job)
+        _queue_export(job.id)
+    return bool(requeued)
+
+
+def _record_heartbeat(job_id):
+    """Mark a running job as alive (called between chunks, once their rows are read)"""
+    ExportJob.query.filter_by(id=job_id, status='RUNNING').update({
+        'heartbeat_at': datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+
+
+def run_export_job(app, job_id):
+    """Build the export file for a job (runs on the export thread pool)"""
+    with app.app_context():
+        try:
+            job = _build_export(app, job_id)
+            
+            # Housekeeping only; a failure here must not mark the finished export as failed
+            if job is not None:
+                try:
+                    prune_export_artifacts(job)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error pruning old exports for job {job_id}: {e}")
+        
+        finally:
+            with _local_jobs_lock:
+                _local_job_ids.discard(job_id)
+            db.session.remove()
+
+
+def _build_export(app, job_id):
+    """Claim and build a job's export file. Returns the completed job, or None"""
+    part_path = None
+    try:
+        # Claim the job; a requeued job may already have been picked up elsewhere
+        claimed = ExportJob.query.filter_by(id=job_id, status='PENDING').update({
+            'status': 'RUNNING',
+            'heartbeat_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            return None
+        
+        job = db.session.get(ExportJob, job_id)
+        os.makedirs(app.config['EXPORT_FOLDER'], exist_ok=True)
+        path = get_artifact_path(job)
+        
+        # Write under a temporary name so a partial file is never served
+        part_path = f"{path}.{secrets.token_hex(4)}.part"
+        export_to_excel_stream(job.course, job.role_filter, part_path,
+                               on_chunk=lambda: _record_heartbeat(job_id))
+        os.replace(part_path, path)
+        
+        job.status = 'COMPLETED'
+        job.completed_at = datetime.utcnow()
+        db.session.commit()
+        return job
+    
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error running export job {job_id}: {e}")
+        
+        if part_path and os.path.exists(part_path):
+            os.remove(part_path)
+        
+        try:
+            job = db.session.get(ExportJob, job_id)
+            if job:
+                job.status = 'FAILED'
+                job.error = str(e)
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error marking export job {job_id} as failed: {e}")
+        return None
+
+
+def prune_export_artifacts(job):
+    """Delete older finished exports of the same course and role"""
+    stale_jobs = ExportJob.query.filter(
+        ExportJob.course_id == job.course_id,
+        ExportJob.role_filter == job.role_filter,
+        ExportJob.data_version != job.data_version,
+        ExportJob.status.in_(['COMPLETED', 'FAILED'])
+    ).all()
+    
+    for stale_job in stale_jobs:
+        if stale_job.filename:
+            path = get_artifact_path(stale_job)
+            if os.path.exists(path):
+                os.remove(path)
+        db.session.delete(stale_job)
+    
+    db.session.commit()
@@ -0,0 +1,338 @@
+"""
+Uploaded file storage
+Participant uploads are streamed from the multipart body straight into
+UPLOAD_FOLDER as the request is parsed, hashing and counting the bytes as they
+arrive. A worker never holds a whole file, no second copy is made after
+parsing, and a file is rejected as soon as it crosses MAX_UPLOAD_FILE_SIZE.
+
+Stored data is content-addressed: each distinct file is kept once as a blob
+named by its SHA-256 under hash-prefix directories (blobs/ab/cd/abcd...), and
+a FileBlob row counts the UploadedFile rows that reference it. The blob is
+removed when its last reference is deleted. Files uploaded before this layout
+are moved into it by `flask migrate-uploads`.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import Counter
+from flask import Request, current_app
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import RequestEntityTooLarge
+from models import db, FileBlob
+
+# Endpoints whose file parts are streamed straight into the upload folder
+STREAMED_UPLOAD_ENDPOINTS = {'file_upload'}
+
+# Blobs live under UPLOAD_FOLDER/blobs/<2 hex>/<2 hex>/<sha256>
+BLOB_DIRECTORY = 'blobs'
+
+
+def _file_too_large(max_size):
+    return RequestEntityTooLarge(f"Files may be at most {max_size // (1024 * 1024)} MB.")
+
+
+class HashingUploadStream:
+    """
+    Temporary file in the upload folder that computes SHA-256 and size while
+    being written. commit() moves it into place; close() discards it otherwise
+    """
+    
+    def __init__(self, directory, max_size):
+        fd, self.temp_path = tempfile.mkstemp(dir=directory, prefix='.incoming-')
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self.max_size = max_size
+        self.size = 0
+        self.committed = False
+    
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.close()
+            raise _file_too_large(self.max_size)
+        
+        self._hash.update(data)
+        return self._file.write(data)
+    
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+    
+    def commit(self, path):
+        """Move the finished file to path"""
+        self._file.close()
+        os.replace(self.temp_path, path)
+        self.committed = True
+    
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if not self.committed and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+    
+    def __getattr__(self, name):
+        # read/seek/tell etc. for code that reads the upload back
+        return getattr(self._file, name)
+
+
+class UploadRequest(Request):
+    """Request that streams the file parts of STREAMED_UPLOAD_ENDPOINTS into the upload folder"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._upload_streams = []
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint not in STREAMED_UPLOAD_ENDPOINTS:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        
+        max_size = current_app.config['MAX_UPLOAD_FILE_SIZE']
+        if content_length is not None and content_length > max_size:
+            raise _file_too_large(max_size)
+        
+        stream = HashingUploadStream(current_app.config['UPLOAD_FOLDER'], max_size)
+        self._upload_streams.append(stream)
+        return stream
+    
+    def close(self):
+        # Removes the temporary files of parts that were never stored
+        for stream in self._upload_streams:
+            stream.close()
+        super().close()
+
+
+def blob_filename(sha256):
+    """Stored filename (relative to UPLOAD_FOLDER) of the blob with this digest"""
+    return f"{BLOB_DIRECTORY}/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def blob_digest(filename):
+    """Digest of the blob a stored filename points to, or None for files outside the blob store"""
+    if not filename.startswith(BLOB_DIRECTORY + '/'):
+        return None
+    return filename.rsplit('/', 1)[1]
+
+
+def stored_file_path(filename):
+    """Absolute path of a stored filename (UploadedFile.filename)"""
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+
+
+def hash_file(path):
+    """
+    Read a file in UPLOAD_CHUNK_SIZE chunks
+    Returns (size in bytes, SHA-256 hex digest)
+    """
+    chunk_size = current_app.config['UPLOAD_CHUNK_SIZE']
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def store_upload(file):
+    """
+    Store an uploaded file in the blob store, reusing the blob if the same
+    content is already there, and count the reference for its new row (in the
+    caller's transaction). The reference is taken before the blob is checked,
+    so a concurrent remove_stored_files() cannot unlink it out from under us
+    Returns (stored filename, size in bytes, SHA-256 hex digest)
+    """
+    stream = file.stream
+    if not isinstance(stream, HashingUploadStream):
+        # Not streamed by UploadRequest: copy in chunks, hashing in the same pass
+        chunk_size = current_app.config['UPLOAD_CHUNK_SIZE']
+        target = HashingUploadStream(current_app.config['UPLOAD_FOLDER'], current_app.config['MAX_UPLOAD_FILE_SIZE'])
+        try:
+            for chunk in iter(lambda: stream.read(chunk_size), b''):
+                target.write(chunk)
+        except Exception:
+            target.close()
+            raise
+        stream = target
+    
+    filename = blob_filename(stream.sha256)
+    path = stored_file_path(filename)
+    try:
+        add_blob_reference(stream.sha256, stream.size)
+        try:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                stream.commit(path)
+        except Exception:
+            # Not stored, so not referenced
+            FileBlob.query.filter_by(sha256=stream.sha256).update(
+                {'ref_count': FileBlob.ref_count - 1}, synchronize_session=False
+            )
+            raise
+    finally:
+        # Discards the temporary copy of content that was already stored
+        stream.close()
+    
+    return filename, stream.size, stream.sha256
+
+
+def add_blob_reference(sha256, size):
+    """Count one more UploadedFile referencing a blob, creating its FileBlob row if needed"""
+    while True:
+        # Locks the row until commit, so removal of the blob waits for us
+        updated = FileBlob.query.filter_by(sha256=sha256).update(
+            {'ref_count': FileBlob.ref_count + 1}, synchronize_session=False
+        )
+        if updated:
+            return
+        
+        try:
+            with db.session.begin_nested():
+                db.session.add(FileBlob(sha256=sha256, size=size, ref_count=1))
+            return
+        except IntegrityError:
+            # Another upload of the same content created the row first
+            continue
+
+
+def release_uploaded_files(uploaded_files):
+    """
+    Drop the references of UploadedFile rows that are being deleted (call
+    before committing the delete)
+    Returns the stored filenames to pass to remove_stored_files() after the commit
+    """
+    digests = Counter()
+    removable = []
+    for uploaded_file in uploaded_files:
+        sha256 = blob_digest(uploaded_file.filename)
+        if sha256:
+            digests[sha256] += 1
+        else:
+            removable.append(uploaded_file.filename)
+    
+    for sha256, count in digests.items():
+        FileBlob.query.filter_by(sha256=sha256).update(
+            {'ref_count': FileBlob.ref_count - count}, synchronize_session=False
+        )
+        removable.append(blob_filename(sha256))
+    
+    return removable
+
+
+def _remove_blob_if_unreferenced(sha256):
+    """
+    Delete a blob's FileBlob row and file if nothing references it, in one
+    transaction. The row stays locked while the file is unlinked, so an upload
+    of the same content either counts its reference first (and the blob is
+    kept) or waits and stores the file again
+    """
+    unreferenced = FileBlob.query.filter(FileBlob.sha256 == sha256, FileBlob.ref_count <= 0)
+    try:
+        deleted = unreferenced.delete(synchronize_session=False)
+        if not deleted and not db.session.query(FileBlob.sha256).filter_by(sha256=sha256).first():
+            # No row at all (an upload whose commit failed): insert one of our
+            # own to hold, which waits out a concurrent upload inserting it
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(FileBlob.__table__.insert().values(sha256=sha256, size=0, ref_count=0))
+            except IntegrityError:
+                pass
+            deleted = unreferenced.delete(synchronize_session=False)
+        
+        if deleted:
+            try:
+                os.remove(stored_file_path(blob_filename(sha256)))
+            except FileNotFoundError:
+                pass
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def remove_stored_files(filenames):
+    """
+    Delete stored files from disk once the rows referencing them are gone
+    (call after committing). Blobs that were referenced again are kept
+    """
+    for filename in filenames:
+        sha256 = blob_digest(filename)
+        if sha256:
+            _remove_blob_if_unreferenced(sha256)
+            continue
+        
+        try:
+            os.remove(stored_file_path(filename))
+        except FileNotFoundError:
+            pass
+
+
+def find_legacy_file(uploaded_file):
+    """
+    Locate a file stored before the blob layout: flat in UPLOAD_FOLDER, or in
+    the per-person directories older versions of the upload code wrote
+    Returns the path, or None if it is missing
+    """
+    candidates = [
+        stored_file_path(uploaded_file.filename),
+        stored_file_path(os.path.join(str(uploaded_file.person_id), uploaded_file.filename)),
+    ]
+    for path in candidates:
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def migrate_legacy_upload(uploaded_file):
+    """
+    Move a file stored before the blob layout into the blob store and commit
+    the updated UploadedFile. The blob is verified against the source checksum
+    (and the one recorded at upload, if any) before the source is removed
+    Returns 'migrated', 'deduplicated', 'missing' or 'mismatch'
+    """
+    source = find_legacy_file(uploaded_file)
+    if source is None:
+        return 'missing'
+    
+    size, sha256 = hash_file(source)
+    if uploaded_file.sha256 and uploaded_file.sha256 != sha256:
+        # Changed or damaged on disk since it was uploaded; leave it for a human
+        return 'mismatch'
+    
+    filename = blob_filename(sha256)
+    target = stored_file_path(filename)
+    # Counted before the blob is checked, as in store_upload()
+    add_blob_reference(sha256, size)
+    
+    if os.path.exists(target) and hash_file(target)[1] == sha256:
+        outcome = 'deduplicated'
+    else:
+        # Hard link when possible so nothing is copied, then verify before swapping in
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = f"{target}.migrating"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        try:
+            os.link(source, temp_path)
+        except OSError:
+            shutil.copyfile(source, temp_path)
+        
+        if hash_file(temp_path) != (size, sha256):
+            os.remove(temp_path)
+            db.session.rollback()
+            return 'mismatch'
+        os.replace(temp_path, target)
+        outcome = 'migrated'
+    
+    uploaded_file.filename = filename
+    uploaded_file.file_size = size
+    uploaded_file.sha256 = sha256
+    db.session.commit()
+    
+    # Only once the row points at the verified blob
+    os.remove(source)
+    source_directory = os.path.dirname(source)
+    if source_directory != os.path.normpath(current_app.config['UPLOAD_FOLDER']) and not os.listdir(source_directory):
+        os.rmdir(source_directory)
+    return outcome
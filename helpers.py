@@ -19,39 +19,6 @@ def allowed_file(filename):
     return ext in current_app.config['ALLOWED_EXTENSIONS']
 
 
-def save_uploaded_file(file, person_id):
-    """
-    Save uploaded file to disk
-    Returns: (success, filename, filepath, error_message)
-    """
-    try:
-        if not file or file.filename == '':
-            return False, None, None, "No file selected"
-        
-        if not allowed_file(file.filename):
-            return False, None, None, "File type not allowed"
-        
-        # Create person-specific directory
-        upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], str(person_id))
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Generate unique filename
-        original_filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        random_string = secrets.token_hex(4)
-        filename = f"{timestamp}_{random_string}_{original_filename}"   
-       
-
- # Save file
-        filepath = os.path.join(upload_dir, filename)
-        file.save(filepath)
-        
-        return True, filename, filepath, None
-        
-    except Exception as e:
-        return False, None, None, str(e)
-
-
 def get_file_icon(filename):
     """Get Font Awesome icon class based on file extension"""
     if '.' not in filename:
@@ -138,10 +105,10 @@ def delete_file_safely(filepath):
         return False
 
 
-def get_upload_path(person_id, filename):
-    """Get the full upload path for a file"""
-    upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], str(person_id))
-    return os.path.join(upload_dir, filename)
+def get_upload_path(filename):
+    """Get the full upload path for a stored filename (UploadedFile.filename)"""
+    from file_storage import stored_file_path
+    return stored_file_path(filename)
 
 
 def calculate_response_rate(total, responded):
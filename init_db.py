@@ -9,6 +9,7 @@ import sys
 from getpass import getpass
 from app import create_app, db
 from models import Admin
+from schema import SCHEMA_VERSION, bootstrap_database
 from werkzeug.security import generate_password_hash
 
 
@@ -39,8 +40,8 @@ def init_database():
             if os.path.exists(db_path):
                 response = input("\nDatabase already exists. Recreate it? (yes/no): ")
                 if response.lower() != 'yes':
-                    print("Initialization cancelled.")                  
-  return
+                    print("Initialization cancelled.")
+                    return
                 
                 # Backup existing database
                 backup_path = db_path + '.backup'
@@ -58,8 +59,8 @@ def init_database():
         
         print("\nCreating database tables...")
         try:
-            db.create_all()
-            print("✓ Database tables created successfully!")
+            bootstrap_database()
+            print(f"✓ Database tables created successfully! (schema version {SCHEMA_VERSION})")
         except Exception as e:
             print(f"✗ Error creating tables: {e}")
             print("\nTroubleshooting:")
@@ -275,8 +276,8 @@ def test_connection():
             print(f"✗ Connection failed: {e}")
             print("\nTroubleshooting:")
             print("1. Check DATABASE_URL is set correctly")
-            print("2. Verify database server is running")            
-print("3. Check network connectivity")
+            print("2. Verify database server is running")
+            print("3. Check network connectivity")
             print("4. Verify database credentials")
         
         print()
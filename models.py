@@ -52,12 +52,18 @@ class Course(db.Model):
     hotel_night3 = db.Column(db.Date)
     hotel_night3_label = db.Column(db.String(100), default='Night 3')
     
+    # Bumped whenever the course's custom questions change (invalidates cached question lists)
+    questions_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     persons = db.relationship('Person', backref='course', lazy=True, cascade='all, delete-orphan')
     questions = db.relationship('CustomQuestion', backref='course', lazy=True, cascade='all, delete-orphan')
+    export_jobs = db.relationship('ExportJob', backref='course', lazy=True, cascade='all, delete-orphan')
+    person_imports = db.relationship('PersonImport', backref='course', lazy=True, cascade='all, delete-orphan')
+    email_batches = db.relationship('EmailBatch', backref='course', lazy=True, cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<Course {self.name}>'
@@ -102,10 +108,20 @@ class Person(db.Model):
     hotel_request = db.relationship('HotelRequest', backref='person', uselist=False, cascade='all, delete-orphan')
     files = db.relationship('UploadedFile', backref='person', lazy=True, cascade='all, delete-orphan')
     
+    # Roster, statistics and reminder queries filter on these
+    __table_args__ = (
+        db.Index('ix_persons_course_role', 'course_id', 'role'),
+        db.Index('ix_persons_course_status_info', 'course_id', 'status', 'info_completed'),
+    )
+    
     def __repr__(self):
         return f'<Person {self.email} ({self.role})>'
 
 
+# One person per email per course; emails are compared case-insensitively (as in imports)
+db.Index('uq_persons_course_email', Person.course_id, db.func.lower(Person.email), unique=True)
+
+
 class CustomQuestion(db.Model):
     """Editable questions for info form"""
     __tablename__ = 'custom_questions'
@@ -140,6 +156,11 @@ class Answer(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # One answer per person per question
+    __table_args__ = (
+        db.Index('uq_answers_person_question', 'person_id', 'question_id', unique=True),
+    )
+    
     def __repr__(self):
         return f'<Answer {self.id}>'
 
@@ -178,15 +199,31 @@ class UploadedFile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     person_id = db.Column(db.Integer, db.ForeignKey('persons.id'), nullable=False)
     
-    filename = db.Column(db.String(255), nullable=False)  # Stored filename
+    filename = db.Column(db.String(255), nullable=False)  # Stored filename, relative to UPLOAD_FOLDER
     original_filename = db.Column(db.String(255), nullable=False)  # Original filename
     file_size = db.Column(db.Integer)
+    sha256 = db.Column(db.String(64), index=True)  # Hex digest computed while the upload streams in
     
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def __repr__(self):
         return f'<UploadedFile {self.original_filename}>'
 
+
+class FileBlob(db.Model):
+    """Stored upload content, shared by every UploadedFile with the same SHA-256"""
+    __tablename__ = 'file_blobs'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)  # UploadedFile rows pointing at this blob
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<FileBlob {self.sha256[:12]} refs={self.ref_count}>'
+
+
 class EmailTemplate(db.Model):
     """Editable email templates"""
     __tablename__ = 'email_templates'
@@ -210,4 +247,129 @@ class EmailTemplate(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
-        return f'<EmailTemplate {self.template_name}>'
\ No newline at end of file
+        return f'<EmailTemplate {self.template_name}>'
+
+
+class ExportJob(db.Model):
+    """Background Excel export job and its cached artifact"""
+    __tablename__ = 'export_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True, default=lambda: secrets.token_hex(16))
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False, index=True)
+    role_filter = db.Column(db.String(20))  # None (all), PARTICIPANT or FACULTY
+    
+    # Fingerprint of the course data the artifact was built from
+    data_version = db.Column(db.String(64), nullable=False)
+    
+    status = db.Column(db.String(20), default='PENDING')  # PENDING, RUNNING, COMPLETED, FAILED
+    filename = db.Column(db.String(255))  # Artifact filename in EXPORT_FOLDER
+    error = db.Column(db.Text)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    heartbeat_at = db.Column(db.DateTime)  # Last progress from the worker running the job
+    completed_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<ExportJob {self.id} ({self.status})>'
+
+
+class PersonImport(db.Model):
+    """Chunked roster import with progress, so a failed import can resume"""
+    __tablename__ = 'person_imports'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False, index=True)
+    
+    original_filename = db.Column(db.String(255), nullable=False)
+    stored_filename = db.Column(db.String(255), nullable=False)  # Copy of the upload in IMPORT_FOLDER
+    update_existing = db.Column(db.Boolean, default=False)
+    
+    status = db.Column(db.String(20), default='PENDING')  # PENDING, RUNNING, COMPLETED, FAILED
+    error = db.Column(db.Text)
+    
+    # Progress, advanced in the same transaction as each chunk's rows
+    chunks_committed = db.Column(db.Integer, default=0)
+    rows_processed = db.Column(db.Integer, default=0)
+    added_count = db.Column(db.Integer, default=0)
+    updated_count = db.Column(db.Integer, default=0)
+    skipped_count = db.Column(db.Integer, default=0)
+    rejected_count = db.Column(db.Integer, default=0)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<PersonImport {self.original_filename} ({self.status})>'
+
+
+class EmailBatch(db.Model):
+    """A bulk send queued through the outbox"""
+    __tablename__ = 'email_batches'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), nullable=False, index=True)
+    
+    kind = db.Column(db.String(50), nullable=False)  # rsvp, info_form, hotel_request
+    total = db.Column(db.Integer, default=0)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    emails = db.relationship('OutboxEmail', backref='batch', lazy=True, cascade='all, delete-orphan')
+    
+    def __repr__(self):
+        return f'<EmailBatch {self.id} ({self.kind})>'
+
+
+class OutboxEmail(db.Model):
+    """Rendered email waiting to be sent by the outbox workers"""
+    __tablename__ = 'outbox_emails'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.Integer, db.ForeignKey('email_batches.id'), nullable=False, index=True)
+    
+    recipient = db.Column(db.String(200), nullable=False)
+    subject = db.Column(db.String(300), nullable=False)
+    html_body = db.Column(db.Text, nullable=False)
+    
+    status = db.Column(db.String(20), default='PENDING', index=True)  # PENDING, SENDING, SENT, FAILED
+    attempts = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    
+    # Claim held by a sender worker while status is SENDING
+    claim_token = db.Column(db.String(32), index=True)
+    claimed_at = db.Column(db.DateTime)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<OutboxEmail {self.recipient} ({self.status})>'
+
+
+class SchedulerLease(db.Model):
+    """Lock row and last run time of a scheduled job"""
+    __tablename__ = 'scheduler_leases'
+    
+    name = db.Column(db.String(100), primary_key=True)  # Job name, e.g. 'reminders'
+    
+    # Lease held by the worker running the job (unused on PostgreSQL, which uses an advisory lock)
+    holder = db.Column(db.String(32))
+    expires_at = db.Column(db.DateTime)
+    
+    last_run_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<SchedulerLease {self.name}>'
+
+
+class SchemaVersion(db.Model):
+    """Schema version recorded by `flask init-db` (single row)"""
+    __tablename__ = 'schema_version'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SchemaVersion {self.version}>'
\ No newline at end of file
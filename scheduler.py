@@ -0,0 +1,178 @@
+"""
+Built-in job scheduler
+Every worker process runs a scheduler thread that wakes up every
+SCHEDULER_POLL_SECONDS and runs jobs whose daily fire time (UTC) has passed
+since their last run. A database lock - an advisory lock on PostgreSQL, a lease
+row in scheduler_leases elsewhere - makes sure only one worker runs each tick.
+Runs missed while the app was down are caught up once on the next wake-up.
+"""
+
+import hashlib
+import random
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from models import db, SchedulerLease
+
+# Identifies this process as a lease holder
+_holder = secrets.token_hex(16)
+
+_scheduler_thread = None
+
+
+def start_scheduler(app, jobs):
+    """
+    Start the scheduler thread for this process (once)
+    Each job is a dict with 'name', 'func', 'hour' and 'minute'
+    """
+    global _scheduler_thread
+    
+    if _scheduler_thread is not None:
+        return
+    
+    _scheduler_thread = threading.Thread(
+        target=_scheduler_loop,
+        args=(app, jobs),
+        name='scheduler',
+        daemon=True
+    )
+    _scheduler_thread.start()
+
+
+def _scheduler_loop(app, jobs):
+    """Scheduler thread: check for due jobs every SCHEDULER_POLL_SECONDS"""
+    while True:
+        # Sleep first, so short-lived processes (flask CLI commands) never run jobs
+        time.sleep(app.config['SCHEDULER_POLL_SECONDS'])
+        
+        for job in jobs:
+            with app.app_context():
+                try:
+                    run_job_if_due(job)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error running scheduled job {job['name']}: {e}")
+                finally:
+                    db.session.remove()
+
+
+def previous_fire_time(job, now):
+    """Most recent time at or before `now` the job was scheduled to run"""
+    fire_time = now.replace(hour=job['hour'], minute=job['minute'], second=0, microsecond=0)
+    if fire_time > now:
+        fire_time -= timedelta(days=1)
+    return fire_time
+
+
+def run_job_if_due(job):
+    """
+    Run a job if it hasn't run since its last fire time
+    Missed fire times are coalesced into a single catch-up run
+    Returns True if this process ran the job
+    """
+    fire_time = previous_fire_time(job, datetime.utcnow())
+    
+    lease = get_lease(job['name'])
+    if lease.last_run_at and lease.last_run_at >= fire_time:
+        return False
+    db.session.commit()
+    
+    # Spread workers out so they don't all race for the lock at the same moment
+    time.sleep(random.uniform(0, current_app.config['SCHEDULER_JITTER_SECONDS']))
+    
+    with job_lock(job['name']) as acquired:
+        if not acquired:
+            return False
+        
+        # Another worker may have finished this tick while we waited
+        db.session.expire_all()
+        lease = get_lease(job['name'])
+        if lease.last_run_at and lease.last_run_at >= fire_time:
+            return False
+        
+        # Recorded up front: a tick is attempted once, even if the job fails
+        lease.last_run_at = datetime.utcnow()
+        db.session.commit()
+        
+        print(f"Running scheduled job {job['name']} (due {fire_time:%Y-%m-%d %H:%M} UTC)")
+        job['func']()
+        return True
+
+
+def get_lease(name):
+    """Return the SchedulerLease row for a job, creating it if needed"""
+    lease = db.session.get(SchedulerLease, name)
+    if lease is not None:
+        return lease
+    
+    try:
+        db.session.add(SchedulerLease(name=name))
+        db.session.commit()
+    except IntegrityError:
+        # Created by another worker at the same time
+        db.session.rollback()
+    
+    return db.session.get(SchedulerLease, name)
+
+
+def advisory_lock_key(name):
+    """Stable signed 64-bit PostgreSQL advisory lock key for a job name"""
+    return int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], 'big', signed=True)
+
+
+@contextmanager
+def job_lock(name):
+    """Try to take the cluster-wide lock for a job; yields whether it was acquired"""
+    if db.engine.dialect.name == 'postgresql':
+        key = advisory_lock_key(name)
+        
+        # Session-level advisory locks live as long as the connection holding them
+        with db.engine.connect() as connection:
+            acquired = connection.execute(
+                db.text('SELECT pg_try_advisory_lock(:key)'), {'key': key}
+            ).scalar()
+            connection.commit()
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    connection.execute(db.text('SELECT pg_advisory_unlock(:key)'), {'key': key})
+                    connection.commit()
+        return
+    
+    acquired = acquire_lease(name)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            release_lease(name)
+
+
+def acquire_lease(name):
+    """Take the lease row for a job unless another worker holds an unexpired lease"""
+    now = datetime.utcnow()
+    lease_time = timedelta(minutes=current_app.config['SCHEDULER_LEASE_MINUTES'])
+    
+    taken = SchedulerLease.query.filter(
+        SchedulerLease.name == name,
+        db.or_(SchedulerLease.expires_at.is_(None), SchedulerLease.expires_at < now)
+    ).update({
+        'holder': _holder,
+        'expires_at': now + lease_time
+    }, synchronize_session=False)
+    db.session.commit()
+    
+    return taken == 1
+
+
+def release_lease(name):
+    """Give up this process's lease on a job"""
+    SchedulerLease.query.filter_by(name=name, holder=_holder).update({
+        'holder': None,
+        'expires_at': None
+    }, synchronize_session=False)
+    db.session.commit()
@@ -0,0 +1,198 @@
+"""
+Schema maintenance
+bootstrap_database() is the release step run by `flask init-db`: it creates
+missing tables, columns and indexes (db.create_all() only creates tables), sets
+up the default email templates and records SCHEMA_VERSION. Everything is
+idempotent. Workers only compare the recorded version on startup.
+`flask check-indexes` EXPLAINs the hot queries to confirm they use the indexes.
+"""
+
+from datetime import datetime
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from models import db, Person, Answer, SchemaVersion
+
+# Bump when models gain tables, columns or indexes, so workers know to run the bootstrap
+SCHEMA_VERSION = 4
+
+
+def get_schema_version():
+    """Schema version recorded in the database, or None if it was never bootstrapped"""
+    try:
+        return db.session.query(SchemaVersion.version).filter_by(id=1).scalar()
+    except (OperationalError, ProgrammingError):
+        # No schema_version table yet
+        db.session.rollback()
+        return None
+
+
+def bootstrap_database():
+    """
+    Bring the database up to SCHEMA_VERSION and record it
+    Raises ValueError if duplicate rows prevent creating a unique index
+    Returns dict with the columns and indexes added
+    """
+    from utils import initialize_default_email_templates
+    
+    db.create_all()
+    columns = create_missing_columns()
+    indexes = create_missing_indexes()
+    initialize_default_email_templates()
+    
+    marker = db.session.get(SchemaVersion, 1)
+    if marker is None:
+        marker = SchemaVersion(id=1, version=SCHEMA_VERSION)
+        db.session.add(marker)
+    marker.version = SCHEMA_VERSION
+    marker.applied_at = datetime.utcnow()
+    db.session.commit()
+    
+    return {'columns': columns, 'indexes': indexes}
+
+
+def create_missing_columns():
+    """
+    Add columns declared on the models that existing tables lack
+    New columns must be nullable or have a server_default
+    Returns the 'table.column' names added
+    """
+    inspector = db.inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            
+            ddl = (f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} "
+                   f"{column.type.compile(dialect=db.engine.dialect)}")
+            if column.server_default is not None:
+                ddl += f" DEFAULT '{column.server_default.arg}'"
+            if not column.nullable:
+                ddl += ' NOT NULL'
+            
+            with db.engine.begin() as connection:
+                connection.execute(db.text(ddl))
+            added.append(f'{table.name}.{column.name}')
+    
+    return added
+
+
+def find_index_conflicts():
+    """
+    Find existing rows that would break the unique indexes
+    Returns a list of messages (empty if there are none)
+    """
+    conflicts = []
+    
+    lower_email = db.func.lower(Person.email)
+    duplicate_persons = db.session.query(
+        Person.course_id, lower_email, db.func.count(Person.id)
+    ).group_by(Person.course_id, lower_email).having(db.func.count(Person.id) > 1).all()
+    
+    for course_id, email, count in duplicate_persons:
+        conflicts.append(f"Course {course_id}: {count} persons with email {email}")
+    
+    duplicate_answers = db.session.query(
+        Answer.person_id, Answer.question_id, db.func.count(Answer.id)
+    ).group_by(Answer.person_id, Answer.question_id).having(db.func.count(Answer.id) > 1).all()
+    
+    for person_id, question_id, count in duplicate_answers:
+        conflicts.append(f"Person {person_id}: {count} answers to question {question_id}")
+    
+    return conflicts
+
+
+def existing_index_names(table_name):
+    """Names of the indexes a table has in the database"""
+    if db.engine.dialect.name == 'sqlite':
+        # SQLAlchemy doesn't reflect SQLite expression indexes, so ask sqlite_master
+        return set(db.session.execute(
+            db.text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"),
+            {'table': table_name}
+        ).scalars())
+    
+    return {index['name'] for index in db.inspect(db.engine).get_indexes(table_name)}
+
+
+def create_missing_indexes():
+    """
+    Create indexes declared on the models that the database doesn't have yet
+    Raises ValueError listing duplicate rows if a unique index can't be created
+    Returns the names of the indexes created
+    """
+    inspector = db.inspect(db.engine)
+    
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = existing_index_names(table.name)
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in existing:
+                missing.append(index)
+    
+    if any(index.unique for index in missing):
+        conflicts = find_index_conflicts()
+        if conflicts:
+            raise ValueError("Duplicate rows must be merged before the unique indexes can be created:\n  "
+                             + "\n  ".join(conflicts))
+    
+    for index in missing:
+        index.create(db.engine)
+    
+    return [index.name for index in missing]
+
+
+def _hot_queries():
+    """(description, expected index, query) for the most frequent Person/Answer lookups"""
+    course_id = db.session.query(db.func.min(Person.course_id)).scalar() or 1
+    
+    return [
+        ('Roster and statistics by course and role', 'ix_persons_course_role',
+         Person.query.filter_by(course_id=course_id, role='PARTICIPANT')),
+        ('Info reminder selection', 'ix_persons_course_status_info',
+         Person.query.filter(
+             Person.course_id == course_id,
+             Person.status == 'ATTENDING',
+             Person.info_completed.is_(False)
+         )),
+        ('Import email lookup', 'uq_persons_course_email',
+         Person.query.filter(
+             Person.course_id == course_id,
+             db.func.lower(Person.email).in_(['someone@example.com'])
+         )),
+        ('Answer by person and question', 'uq_answers_person_question',
+         Answer.query.filter_by(person_id=1, question_id=1)),
+    ]
+
+
+def explain_hot_queries():
+    """
+    EXPLAIN the hot queries
+    Returns a list of (description, expected index, index used?, plan text)
+    """
+    dialect = db.engine.dialect
+    results = []
+    
+    with db.engine.connect() as connection:
+        if dialect.name == 'postgresql':
+            # Small tables are cheaper to scan; ask whether the index *can* be used
+            connection.execute(db.text('SET enable_seqscan = off'))
+            explain = 'EXPLAIN'
+        else:
+            explain = 'EXPLAIN QUERY PLAN'
+        
+        for description, index_name, query in _hot_queries():
+            sql = str(query.statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+            rows = connection.execute(db.text(f'{explain} {sql}')).all()
+            plan = '; '.join(str(row[-1]) for row in rows)
+            results.append((description, index_name, index_name in plan, plan))
+        
+        connection.rollback()
+    
+    return results
@@ -1,7 +1,10 @@
 import os
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
 from werkzeug.utils import secure_filename
 from config import Config
-from datetime import datetime
+from datetime import datetime, timedelta
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -9,15 +12,41 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
 
 
+def allowed_roster_file(filename):
+    """Check if a roster upload has a CSV/Excel extension"""
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in Config.ROSTER_EXTENSIONS
+
+
+# Hotel nights folded into a 3-bit pattern: night1 = 1, night2 = 2, night3 = 4
+HOTEL_NIGHT_BITS = {
+    'night1': 1,
+    'night2': 2,
+    'night3': 4,
+}
+
+# Night pattern -> sequence bucket in the hotel summary
+HOTEL_SEQUENCE_PATTERNS = {
+    7: 'all_three',     # Night 1, 2, 3
+    3: 'night1_2',      # Night 1, 2
+    6: 'night2_3',      # Night 2, 3
+    5: 'night1_3',      # Night 1, 3
+    1: 'night1_only',
+    2: 'night2_only',
+    4: 'night3_only',
+}
+
+# Pattern used for attending persons without a hotel request or not needing a hotel
+NO_HOTEL_PATTERN = -1
+
+
 def generate_hotel_summary(course):
-    """Generate hotel room summary for all 3 nights and sequences"""
-    from models import Person, HotelRequest
-    
-    # Get all attending persons
-    persons = Person.query.filter_by(
-        course_id=course.id,
-        status='ATTENDING'
-    ).all()
+    """
+    Generate hotel room summary for all 3 nights and sequences
+    The night flags are folded into a bitmask and grouped by (pattern, role)
+    in the database, so the whole summary comes from one query
+    """
+    from models import db, Person, HotelRequest
     
     summary = {
         'night1': 0,
@@ -47,110 +76,211 @@ def generate_hotel_summary(course):
         }
     }
     
-    for person in persons:
-        hotel = person.hotel_request
-        if hotel and hotel.need_hotel:
-            # Count individual nights
-            if hotel.night1:
-                summary['night1'] += 1
-                summary['by_role'][person.role]['night1'] += 1
-            if hotel.night2:
-                summary['night2'] += 1
-                summary['by_role'][person.role]['night2'] += 1
-            if hotel.night3:
-                summary['night3'] += 1
-                summary['by_role'][person.role]['night3'] += 1
-            
-            # Calculate sequences
-            nights = (hotel.night1, hotel.night2, hotel.night3)
-            if nights == (True, True, True):
-                summary['sequences']['all_three'] += 1
-            elif nights == (True, True, False):
-                summary['sequences']['night1_2'] += 1
-            elif nights == (False, True, True):
-                summary['sequences']['night2_3'] += 1
-            elif nights == (True, False, True):
-                summary['sequences']['night1_3'] += 1
-            elif nights == (True, False, False):
-                summary['sequences']['night1_only'] += 1
-            elif nights == (False, True, False):
-                summary['sequences']['night2_only'] += 1
-            elif nights == (False, False, True):
-                summary['sequences']['night3_only'] += 1
-        else:
-            summary['sequences']['no_hotel'] += 1
+    night_pattern = sum(
+        db.case((getattr(HotelRequest, night).is_(True), bit), else_=0)
+        for night, bit in HOTEL_NIGHT_BITS.items()
+    )
+    pattern = db.case(
+        (HotelRequest.need_hotel.is_(True), night_pattern),
+        else_=NO_HOTEL_PATTERN
+    ).label('pattern')
+    
+    # Get night pattern counts for all attending persons
+    rows = db.session.query(
+        pattern,
+        Person.role,
+        db.func.count(Person.id)
+    ).outerjoin(
+        HotelRequest, HotelRequest.person_id == Person.id
+    ).filter(
+        Person.course_id == course.id,
+        Person.status == 'ATTENDING'
+    ).group_by(
+        pattern,
+        Person.role
+    ).all()
+    
+    for night_bits, role, count in rows:
+        if night_bits == NO_HOTEL_PATTERN:
+            summary['sequences']['no_hotel'] += count
+            continue
+        
+        # Count individual nights
+        role_summary = summary['by_role'].get(role)
+        for night, bit in HOTEL_NIGHT_BITS.items():
+            if night_bits & bit:
+                summary[night] += count
+                if role_summary is not None:
+                    role_summary[night] += count
+        
+        # Calculate sequences
+        sequence = HOTEL_SEQUENCE_PATTERNS.get(night_bits)
+        if sequence:
+            summary['sequences'][sequence] += count
     
     return summary
 
 
+def _export_person_filter(course, role_filter=None):
+    """Filter criteria selecting the persons included in an export"""
+    from models import Person
+    
+    person_filter = [Person.course_id == course.id]
+    if role_filter:
+        person_filter.append(Person.role == role_filter)
+    return person_filter
+
+
+def _load_export_relations(person_filter):
+    """
+    Load answers, hotel requests and file counts for the exported persons
+    with one query each, restricted by person_filter
+    Returns (answers, hotels, file_counts) dicts
+    """
+    from models import db, Person, Answer, HotelRequest, UploadedFile
+    
+    # Load all answers at once, keyed by (person_id, question_id)
+    answers = {}
+    answer_rows = db.session.query(
+        Answer.person_id,
+        Answer.question_id,
+        Answer.answer_text
+    ).join(
+        Person, Person.id == Answer.person_id
+    ).filter(*person_filter).order_by(Answer.id)
+    for person_id, question_id, answer_text in answer_rows:
+        answers.setdefault((person_id, question_id), answer_text)
+    
+    # Load all hotel requests at once
+    hotels = {
+        hotel.person_id: hotel
+        for hotel in HotelRequest.query.join(
+            Person, Person.id == HotelRequest.person_id
+        ).filter(*person_filter)
+    }
+    
+    # Count uploaded files per person
+    file_counts = dict(
+        db.session.query(
+            UploadedFile.person_id,
+            db.func.count(UploadedFile.id)
+        ).join(
+            Person, Person.id == UploadedFile.person_id
+        ).filter(*person_filter).group_by(UploadedFile.person_id).all()
+    )
+    
+    return answers, hotels, file_counts
+
+
+def _build_export_columns(persons, questions, person_filter):
+    """
+    Build export data column by column for the given persons
+    person_filter restricts the related-data lookups to those persons
+    Returns dict of column header -> list of values
+    """
+    answers, hotels, file_counts = {}, {}, {}
+    if persons:
+        answers, hotels, file_counts = _load_export_relations(person_filter)
+    
+    def yes_no(value):
+        return 'Yes' if value else 'No'
+    
+    # Build data column by column
+    person_hotels = [hotels.get(person.id) for person in persons]
+    data = {
+        'Email': [person.email for person in persons],
+        'First Name': [person.first_name for person in persons],
+        'Last Name': [person.last_name for person in persons],
+        'Role': [person.role for person in persons],
+        'Status': [person.status for person in persons],
+        'RSVP Responded': [yes_no(person.attending_responded) for person in persons],
+        'Info Completed': [yes_no(person.info_completed) for person in persons],
+        'Info Reminders Sent': [person.info_reminder_count for person in persons],
+    }
+    
+    # Add custom question answers
+    for question in questions:
+        data[question.label] = [answers.get((person.id, question.id), '') for person in persons]
+    
+    # Add hotel info
+    data['Needs Hotel'] = [
+        yes_no(hotel.need_hotel) if hotel else 'Not Specified' for hotel in person_hotels
+    ]
+    data['Hotel Night 1'] = [yes_no(hotel and hotel.night1) for hotel in person_hotels]
+    data['Hotel Night 2'] = [yes_no(hotel and hotel.night2) for hotel in person_hotels]
+    data['Hotel Night 3'] = [yes_no(hotel and hotel.night3) for hotel in person_hotels]
+    data['Hotel Completed'] = [yes_no(hotel and hotel.completed) for hotel in person_hotels]
+    data['Hotel Reminders Sent'] = [hotel.reminder_count if hotel else 0 for hotel in person_hotels]
+    data['Hotel Final Notice'] = [yes_no(hotel and hotel.final_notice_sent) for hotel in person_hotels]
+    
+    # Add file upload count
+    data['Files Uploaded'] = [file_counts.get(person.id, 0) for person in persons]
+    
+    return data
+
+
+def _hotel_summary_rows(course):
+    """Return (metric, count) rows for the Hotel Summary export sheet"""
+    hotel_summary = generate_hotel_summary(course)
+    
+    return [
+        ('Total Night 1', hotel_summary['night1']),
+        ('Total Night 2', hotel_summary['night2']),
+        ('Total Night 3', hotel_summary['night3']),
+        ('', ''),
+        ('Participants Night 1', hotel_summary['by_role']['PARTICIPANT']['night1']),
+        ('Participants Night 2', hotel_summary['by_role']['PARTICIPANT']['night2']),
+        ('Participants Night 3', hotel_summary['by_role']['PARTICIPANT']['night3']),
+        ('', ''),
+        ('Faculty Night 1', hotel_summary['by_role']['FACULTY']['night1']),
+        ('Faculty Night 2', hotel_summary['by_role']['FACULTY']['night2']),
+        ('Faculty Night 3', hotel_summary['by_role']['FACULTY']['night3']),
+        ('', ''),
+        ('All Three Nights', hotel_summary['sequences']['all_three']),
+        ('Night 1 & 2 Only', hotel_summary['sequences']['night1_2']),
+        ('Night 2 & 3 Only', hotel_summary['sequences']['night2_3']),
+        ('Night 1 & 3 Only', hotel_summary['sequences']['night1_3']),
+        ('Night 1 Only', hotel_summary['sequences']['night1_only']),
+        ('Night 2 Only', hotel_summary['sequences']['night2_only']),
+        ('Night 3 Only', hotel_summary['sequences']['night3_only']),
+        ('No Hotel Needed', hotel_summary['sequences']['no_hotel'])
+    ]
+
+
+def _estimate_column_widths(rows):
+    """Estimate column widths from a sample of rows (header row included)"""
+    widths = []
+    for row in rows:
+        for index, value in enumerate(row):
+            length = len(str(value)) if value is not None else 0
+            if index == len(widths):
+                widths.append(length)
+            elif length > widths[index]:
+                widths[index] = length
+    return [min(width + 2, 50) for width in widths]
+
+
 def export_to_excel(course, role_filter=None):
     """
     Export participant/faculty data to Excel
     role_filter: None (all), 'PARTICIPANT', or 'FACULTY'
+    Builds the whole workbook in memory; see export_to_excel_stream for large courses
     """
     import pandas as pd
     from io import BytesIO
-    from models import Person, CustomQuestion, Answer
+    from models import Person, CustomQuestion
     
     # Get persons based on filter
-    query = Person.query.filter_by(course_id=course.id)
-    if role_filter:
-        query = query.filter_by(role=role_filter)
-    persons = query.all()
+    person_filter = _export_person_filter(course, role_filter)
+    persons = Person.query.filter(*person_filter).order_by(Person.id).all()
     
     # Get all questions
     questions = CustomQuestion.query.filter_by(
         course_id=course.id
     ).order_by(CustomQuestion.order).all()
     
-     # Build data structure
-    data = []
-    for person in persons:
-        row = {
-            'Email': person.email,
-            'First Name': person.first_name,
-            'Last Name': person.last_name,
-            'Role': person.role,
-            'Status': person.status,
-            'RSVP Responded': 'Yes' if person.attending_responded else 'No',
-            'Info Completed': 'Yes' if person.info_completed else 'No',
-            'Info Reminders Sent': person.info_reminder_count,
-        }
-        
-        # Add custom question answers
-        for question in questions:
-            answer = Answer.query.filter_by(
-                person_id=person.id,
-                question_id=question.id
-            ).first()
-            row[question.label] = answer.answer_text if answer else ''
-        
-        # Add hotel info
-        hotel = person.hotel_request
-        if hotel:
-            row['Needs Hotel'] = 'Yes' if hotel.need_hotel else 'No'
-            row['Hotel Night 1'] = 'Yes' if hotel.night1 else 'No'
-            row['Hotel Night 2'] = 'Yes' if hotel.night2 else 'No'
-            row['Hotel Night 3'] = 'Yes' if hotel.night3 else 'No'
-            row['Hotel Completed'] = 'Yes' if hotel.completed else 'No'
-            row['Hotel Reminders Sent'] = hotel.reminder_count
-            row['Hotel Final Notice'] = 'Yes' if hotel.final_notice_sent else 'No'
-        else:
-            row['Needs Hotel'] = 'Not Specified'
-            row['Hotel Night 1'] = 'No'
-            row['Hotel Night 2'] = 'No'
-            row['Hotel Night 3'] = 'No'
-            row['Hotel Completed'] = 'No'
-            row['Hotel Reminders Sent'] = 0
-            row['Hotel Final Notice'] = 'No'
-        
-        # Add file upload count
-        row['Files Uploaded'] = len(person.files)
-        
-        data.append(row)
-    
     # Create DataFrame
-    df = pd.DataFrame(data)
+    df = pd.DataFrame(_build_export_columns(persons, questions, person_filter))
     
     # Create Excel file in memory
     output = BytesIO()
@@ -160,54 +290,7 @@ def export_to_excel(course, role_filter=None):
         df.to_excel(writer, sheet_name=sheet_name, index=False)
         
         # Add hotel summary sheet
-        hotel_summary = generate_hotel_summary(course)
-        summary_data = {
-            'Metric': [
-                'Total Night 1',
-                'Total Night 2',
-                'Total Night 3',
-                '',
-                'Participants Night 1',
-                'Participants Night 2',
-                'Participants Night 3',
-                '',
-                'Faculty Night 1',
-                'Faculty Night 2',
-                'Faculty Night 3',
-                '',
-                'All Three Nights',
-                'Night 1 & 2 Only',
-                'Night 2 & 3 Only',
-                'Night 1 & 3 Only',
-                'Night 1 Only',
-                'Night 2 Only',
-                'Night 3 Only',
-                'No Hotel Needed'
-            ],
-            'Count': [
-                hotel_summary['night1'],
-                hotel_summary['night2'],
-                hotel_summary['night3'],
-                '',
-                hotel_summary['by_role']['PARTICIPANT']['night1'],
-                hotel_summary['by_role']['PARTICIPANT']['night2'],
-                hotel_summary['by_role']['PARTICIPANT']['night3'],
-                '',
-                hotel_summary['by_role']['FACULTY']['night1'],
-                hotel_summary['by_role']['FACULTY']['night2'],
-                hotel_summary['by_role']['FACULTY']['night3'],
-                '',
-		hotel_summary['sequences']['all_three'],
-                hotel_summary['sequences']['night1_2'],
-                hotel_summary['sequences']['night2_3'],
-                hotel_summary['sequences']['night1_3'],
-                hotel_summary['sequences']['night1_only'],
-                hotel_summary['sequences']['night2_only'],
-                hotel_summary['sequences']['night3_only'],
-                hotel_summary['sequences']['no_hotel']
-            ]
-        }
-        summary_df = pd.DataFrame(summary_data)
+        summary_df = pd.DataFrame(_hotel_summary_rows(course), columns=['Metric', 'Count'])
         summary_df.to_excel(writer, sheet_name='Hotel Summary', index=False)
         
         # Adjust column widths
@@ -229,50 +312,418 @@ def export_to_excel(course, role_filter=None):
     return output
 
 
+def export_to_excel_stream(course, role_filter=None, path=None, on_chunk=None):
+    """
+    Stream participant/faculty data to an Excel file on disk
+    role_filter: None (all), 'PARTICIPANT', or 'FACULTY'
+    on_chunk: optional callable run after each chunk is read (progress heartbeat)
+    Persons are read in keyset-paged chunks of Config.EXPORT_CHUNK_SIZE (no
+    cursor stays open between chunks, so on_chunk may commit) and written with
+    a write-only workbook, so memory stays flat regardless of row count. Column widths are estimated from the
+    first Config.EXPORT_WIDTH_SAMPLE_ROWS rows.
+    Returns the path of the written file (a new temp file if path is None)
+    """
+    import tempfile
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+    from models import Person, CustomQuestion
+    
+    if path is None:
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+    
+    questions = CustomQuestion.query.filter_by(
+        course_id=course.id
+    ).order_by(CustomQuestion.order).all()
+    
+    person_filter = _export_person_filter(course, role_filter)
+    
+    def iter_chunks():
+        last_id = 0
+        while True:
+            chunk = Person.query.filter(
+                *person_filter,
+                Person.id > last_id
+            ).order_by(Person.id).limit(Config.EXPORT_CHUNK_SIZE).all()
+            if not chunk:
+                return
+            last_id = chunk[-1].id
+            columns = _build_export_columns(
+                chunk, questions, [Person.id.in_([person.id for person in chunk])]
+            )
+            if on_chunk:
+                on_chunk()
+            yield list(columns), list(zip(*columns.values()))
+    
+    workbook = Workbook(write_only=True)
+    
+    # Main data sheet
+    worksheet = workbook.create_sheet(role_filter if role_filter else 'All Persons')
+    chunks = iter_chunks()
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
+        header = list(_build_export_columns([], questions, person_filter))
+        first_rows = []
+    else:
+        header, first_rows = first_chunk
+    
+    # Write-only sheets need their widths set before the first row
+    sample = [header] + first_rows[:Config.EXPORT_WIDTH_SAMPLE_ROWS]
+    for index, width in enumerate(_estimate_column_widths(sample), start=1):
+        worksheet.column_dimensions[get_column_letter(index)].width = width
+    
+    worksheet.append(header)
+    for row in first_rows:
+        worksheet.append(row)
+    for _, rows in chunks:
+        for row in rows:
+            worksheet.append(row)
+    
+    # Add hotel summary sheet
+    summary_sheet = workbook.create_sheet('Hotel Summary')
+    summary_rows = [('Metric', 'Count')] + _hotel_summary_rows(course)
+    for index, width in enumerate(_estimate_column_widths(summary_rows), start=1):
+        summary_sheet.column_dimensions[get_column_letter(index)].width = width
+    for row in summary_rows:
+        summary_sheet.append(row)
+    
+    workbook.save(path)
+    return path
+
+
+# Basic email format check used when parsing uploaded rosters
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+
+VALID_ROLES = ['PARTICIPANT', 'FACULTY']
+
+
 def parse_uploaded_csv(file):
     """
     Parse uploaded CSV/Excel file with participants
     Expected columns: email, first_name, last_name, role (optional)
-    Returns list of dicts
+    Returns (persons, rejected, error): persons is a list of dicts, rejected
+    a list of dicts with the file row number, email and reason
     """
     import pandas as pd
     
     try:
         # Try reading as Excel
         if file.filename.endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(file)
+            df = pd.read_excel(file, dtype=str)
         else:
             # Try CSV
-            df = pd.read_csv(file)
+            df = pd.read_csv(file, dtype=str)
         
-        # Normalize column names
-        df.columns = df.columns.str.lower().str.strip()
+        return normalize_persons_frame(df)
+    
+    except Exception as e:
+        return None, [], f"Error parsing file: {str(e)}"
+
+
+def normalize_persons_frame(df, first_row=2):
+    """
+    Normalize and validate a DataFrame of uploaded persons with column operations
+    first_row is the file row number of the DataFrame's first row (after the header)
+    Returns (persons, rejected, error) like parse_uploaded_csv
+    """
+    import pandas as pd
+    
+    # Normalize column names
+    df.columns = df.columns.astype(str).str.lower().str.strip()
+    
+    # Required columns
+    required_cols = ['email']
+    for col in required_cols:
+        if col not in df.columns:
+            return None, [], f"Missing required column: {col}"
+    
+    def text_column(name):
+        if name not in df.columns:
+            return pd.Series('', index=df.index)
+        return df[name].fillna('').astype(str).str.strip()
+    
+    normalized = pd.DataFrame({
+        'email': text_column('email').str.lower(),
+        'first_name': text_column('first_name'),
+        'last_name': text_column('last_name'),
+        'role': text_column('role').str.upper().replace('', 'PARTICIPANT')
+    })
+    
+    # Validate, keeping the first reason that applies to each row
+    reasons = pd.Series('', index=normalized.index)
+    checks = [
+        (normalized['email'] == '', 'Missing email'),
+        (~normalized['email'].str.match(EMAIL_PATTERN), 'Invalid email'),
+        (~normalized['role'].isin(VALID_ROLES), 'Invalid role (must be PARTICIPANT or FACULTY)'),
+    ]
+    for failed, reason in checks:
+        reasons = reasons.mask(failed & (reasons == ''), reason)
+    
+    # Duplicate emails within the file (first valid occurrence wins; rejected rows don't count)
+    passed = reasons == ''
+    duplicated = normalized['email'].where(passed).duplicated(keep='first') & passed
+    reasons = reasons.mask(duplicated, 'Duplicate email in file')
+    
+    valid = reasons == ''
+    persons = normalized[valid].to_dict('records')
+    
+    rejected_rows = normalized.loc[~valid, ['email']].assign(
+        row=(normalized.index[~valid] + first_row).astype(int),
+        reason=reasons[~valid]
+    )
+    rejected = rejected_rows[['row', 'email', 'reason']].to_dict('records')
+    
+    return persons, rejected, None
+
+
+def import_persons(course_id, persons_data, update_existing=False, preload_course=True):
+    """
+    Add parsed persons to a course in bulk
+    Existing emails for the course are loaded once, new persons are inserted
+    in batches of Config.IMPORT_BATCH_SIZE. With update_existing, names and
+    roles of persons already in the course are updated from the file.
+    With preload_course=False only the emails in persons_data are looked up,
+    which keeps chunked imports from reloading the whole course per chunk.
+    Does not commit; the caller owns the transaction.
+    Returns dict with added, updated and skipped counts
+    """
+    from models import db, Person
+    
+    results = {'added': 0, 'updated': 0, 'skipped': 0}
+    batch_size = Config.IMPORT_BATCH_SIZE
+    
+    # Load existing persons for the course once (emails compared case-insensitively)
+    existing_query = db.session.query(
+        Person.id, Person.email, Person.first_name, Person.last_name, Person.role
+    ).filter(Person.course_id == course_id)
+    
+    if preload_course:
+        existing_rows = existing_query.all()
+    else:
+        emails = sorted({person_data['email'].lower() for person_data in persons_data})
+        existing_rows = []
+        for start in range(0, len(emails), batch_size):
+            existing_rows.extend(existing_query.filter(
+                db.func.lower(Person.email).in_(emails[start:start + batch_size])
+            ).all())
+    
+    existing = {
+        email.lower(): (person_id, first_name, last_name, role)
+        for person_id, email, first_name, last_name, role in existing_rows
+    }
+    
+    new_persons = []
+    updates = []
+    seen = set()
+    now = datetime.utcnow()
+    
+    for person_data in persons_data:
+        email = person_data['email']
         
-        # Required columns
-        required_cols = ['email']
-        for col in required_cols:
-            if col not in df.columns:
-                return None, f"Missing required column: {col}"
+        # Skip duplicates within the file
+        if email in seen:
+            results['skipped'] += 1
+            continue
+        seen.add(email)
         
-        persons = []
-        for _, row in df.iterrows():
-            person = {
-                'email': str(row['email']).strip(),
-                'first_name': str(row.get('first_name', '')).strip() if pd.notna(row.get('first_name')) else '',
-                'last_name': str(row.get('last_name', '')).strip() if pd.notna(row.get('last_name')) else '',
-                'role': str(row.get('role', 'PARTICIPANT')).strip().upper() if pd.notna(row.get('role')) else 'PARTICIPANT'
-            }
+        if email not in existing:
+            new_persons.append({
+                'course_id': course_id,
+                'email': email,
+                'first_name': person_data['first_name'],
+                'last_name': person_data['last_name'],
+                'role': person_data['role']
+            })
+            continue
+        
+        person_id, first_name, last_name, role = existing[email]
+        
+        # Empty names in the file never overwrite existing ones
+        changes = {
+            'first_name': person_data['first_name'] or first_name,
+            'last_name': person_data['last_name'] or last_name,
+            'role': person_data['role']
+        }
+        if not update_existing or changes == {'first_name': first_name, 'last_name': last_name, 'role': role}:
+            results['skipped'] += 1
+            continue
+        
+        changes['id'] = person_id
+        changes['updated_at'] = now
+        updates.append(changes)
+    
+    # Insert new persons in fixed-size batches
+    for start in range(0, len(new_persons), batch_size):
+        db.session.execute(Person.__table__.insert(), new_persons[start:start + batch_size])
+    results['added'] = len(new_persons)
+    
+    # Update changed persons in fixed-size batches
+    for start in range(0, len(updates), batch_size):
+        db.session.bulk_update_mappings(Person, updates[start:start + batch_size])
+    results['updated'] = len(updates)
+    
+    return results
+
+
+def iter_roster_chunks(filepath, chunk_size):
+    """
+    Read an uploaded roster file in chunks of chunk_size rows
+    CSVs are read with pandas chunksize, .xlsx files with a read-only
+    openpyxl workbook; legacy .xls files are read whole and then sliced
+    Yields DataFrames with string (or empty) cells, indexed by the row's
+    number in the file. Empty rows are dropped but still counted
+    """
+    import pandas as pd
+    
+    if filepath.endswith('.xlsx'):
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(filepath, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = [str(value) if value is not None else '' for value in next(rows, ())]
+            chunk = []
+            row_numbers = []
+            for row_number, row in enumerate(rows, start=2):
+                # Read-only sheets can report trailing empty rows
+                if all(value is None for value in row):
+                    continue
+                chunk.append([str(value) if value is not None else None for value in row])
+                row_numbers.append(row_number)
+                if len(chunk) == chunk_size:
+                    yield pd.DataFrame(chunk, columns=header, index=row_numbers)
+                    chunk = []
+                    row_numbers = []
+            if chunk:
+                yield pd.DataFrame(chunk, columns=header, index=row_numbers)
+        finally:
+            workbook.close()
+    
+    elif filepath.endswith('.xls'):
+        df = pd.read_excel(filepath, dtype=str)
+        df.index += 2
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size].dropna(how='all')
+    
+    else:
+        for df in pd.read_csv(filepath, dtype=str, chunksize=chunk_size, skip_blank_lines=False):
+            df.index += 2
+            yield df.dropna(how='all')
+
+
+def start_person_import(course_id, file, update_existing=False):
+    """
+    Store an uploaded roster in IMPORT_FOLDER and record a PersonImport for it
+    The stored copy lets a failed import be resumed later
+    """
+    from models import db, PersonImport
+    import uuid
+    
+    original_filename = secure_filename(file.filename) or 'roster.csv'
+    extension = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else 'csv'
+    stored_filename = f"{uuid.uuid4().hex}.{extension}"
+    
+    os.makedirs(Config.IMPORT_FOLDER, exist_ok=True)
+    file.save(os.path.join(Config.IMPORT_FOLDER, stored_filename))
+    
+    person_import = PersonImport(
+        course_id=course_id,
+        original_filename=original_filename,
+        stored_filename=stored_filename,
+        update_existing=update_existing,
+        status='PENDING'
+    )
+    db.session.add(person_import)
+    db.session.commit()
+    
+    return person_import
+
+
+def resumable_import_condition():
+    """
+    SQL condition for imports that may be started or resumed: new, failed, or
+    RUNNING without a committed chunk for IMPORT_STALE_MINUTES (its run died)
+    """
+    from models import db, PersonImport
+    
+    stale_before = datetime.utcnow() - timedelta(minutes=Config.IMPORT_STALE_MINUTES)
+    return db.or_(
+        PersonImport.status.in_(['PENDING', 'FAILED']),
+        db.and_(PersonImport.status == 'RUNNING', PersonImport.updated_at < stale_before)
+    )
+
+
+def run_person_import(person_import):
+    """
+    Run (or resume) a chunked roster import
+    Each chunk is validated and upserted in its own transaction together with
+    the import's progress, so chunks committed before a failure are skipped
+    when the import is run again. The import is claimed first, so two
+    requests never process the same chunks at once.
+    Returns list of up to 5 rejected rows from this run, for display,
+    or None if the import is already running elsewhere
+    """
+    from models import db, PersonImport
+    
+    filepath = os.path.join(Config.IMPORT_FOLDER, person_import.stored_filename)
+    chunk_size = Config.IMPORT_CHUNK_SIZE
+    rejected_samples = []
+    
+    claimed = PersonImport.query.filter(
+        PersonImport.id == person_import.id,
+        resumable_import_condition()
+    ).update({
+        'status': 'RUNNING',
+        'error': None,
+        'updated_at': datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+    
+    if not claimed:
+        return None
+    db.session.refresh(person_import)
+    
+    try:
+        for chunk_index, df in enumerate(iter_roster_chunks(filepath, chunk_size)):
+            # Skip chunks committed by an earlier run
+            if chunk_index < person_import.chunks_committed:
+                continue
+            
+            # The chunk's index already holds file row numbers
+            persons_data, rejected, error = normalize_persons_frame(df, first_row=0)
+            if error:
+                raise ValueError(error)
             
-            # Validate role
-            if person['role'] not in ['PARTICIPANT', 'FACULTY']:
-                person['role'] = 'PARTICIPANT'
+            results = import_persons(
+                person_import.course_id,
+                persons_data,
+                update_existing=person_import.update_existing,
+                preload_course=False
+            )
             
-            persons.append(person)
+            person_import.chunks_committed = chunk_index + 1
+            person_import.rows_processed += len(df)
+            person_import.added_count += results['added']
+            person_import.updated_count += results['updated']
+            person_import.skipped_count += results['skipped']
+            person_import.rejected_count += len(rejected)
+            db.session.commit()
+            
+            rejected_samples.extend(rejected[:5 - len(rejected_samples)])
+        
+        person_import.status = 'COMPLETED'
+        db.session.commit()
         
-        return persons, None
+        if os.path.exists(filepath):
+            os.remove(filepath)
     
     except Exception as e:
-        return None, f"Error parsing file: {str(e)}"
+        db.session.rollback()
+        person_import.status = 'FAILED'
+        person_import.error = str(e)
+        db.session.commit()
+    
+    return rejected_samples
 
 
 def initialize_default_email_templates():
@@ -519,7 +970,7 @@ def initialize_default_email_templates():
             template = EmailTemplate(**template_data)
             db.session.add(template)
 
-try:
+    try:
         db.session.commit()
         print("✅ Default email templates initialized")
     except Exception as e:
@@ -527,23 +978,84 @@ try:
         print(f"❌ Error initializing templates: {e}")
 
 
-def render_email_template(template_name, variables):
+# Compiled email templates: template_name -> (updated_at, subject_template, body_template)
+_compiled_email_templates = {}
+_compiled_email_templates_lock = threading.Lock()
+
+
+def get_compiled_email_template(template_name):
     """
-    Render an email template with variables
-    Returns (subject, html_body) tuple
+    Return (subject_template, body_template) compiled with Jinja2
+    Templates are compiled once per process and recompiled when their
+    updated_at changes, so edits made through any worker are picked up
     """
-    from models import EmailTemplate
+    from flask import g
+    from models import db, EmailTemplate
     from jinja2 import Template
     
-    # Get template from database
-    template = EmailTemplate.query.filter_by(template_name=template_name).first()
+    # Inside email_template_batch() each template is looked up only once
+    batch_templates = g.get('email_templates')
+    if batch_templates is not None and template_name in batch_templates:
+        return batch_templates[template_name]
+    
+    updated_at = db.session.query(EmailTemplate.updated_at).filter_by(
+        template_name=template_name
+    ).scalar()
+    
+    cached = _compiled_email_templates.get(template_name)
+    if cached is not None and cached[0] == updated_at:
+        compiled = cached[1:]
+    else:
+        template = EmailTemplate.query.filter_by(template_name=template_name).first()
+        
+        if not template:
+            raise ValueError(f"Email template '{template_name}' not found")
+        
+        compiled = (Template(template.subject), Template(template.html_body))
+        with _compiled_email_templates_lock:
+            _compiled_email_templates[template_name] = (template.updated_at,) + compiled
+    
+    if batch_templates is not None:
+        batch_templates[template_name] = compiled
     
-    if not template:
-        raise ValueError(f"Email template '{template_name}' not found")
+    return compiled
+
+
+def invalidate_email_template(template_name=None):
+    """Drop a compiled template (or all of them) from this process's cache"""
+    with _compiled_email_templates_lock:
+        if template_name is None:
+            _compiled_email_templates.clear()
+        else:
+            _compiled_email_templates.pop(template_name, None)
+
+
+@contextmanager
+def email_template_batch():
+    """
+    Render every email inside the block from one lookup per template
+    Used by the outbox and reminders so a batch doesn't re-check the template version per email
+    """
+    from flask import g
     
-    # Render subject and body with Jinja2
-    subject_template = Template(template.subject)
-    body_template = Template(template.html_body)
+    # Nested blocks keep using the outer batch
+    if g.get('email_templates') is not None:
+        yield
+        return
+    
+    g.email_templates = {}
+    try:
+        yield
+    finally:
+        g.pop('email_templates')
+
+
+def render_email_template(template_name, variables):
+    """
+    Render an email template with variables
+    Returns (subject, html_body) tuple
+    """
+    subject_template, body_template = get_compiled_email_template(template_name)
     
     rendered_subject = subject_template.render(**variables)
     rendered_body = body_template.render(**variables)
@@ -551,11 +1063,57 @@ def render_email_template(template_name, variables):
     return rendered_subject, rendered_body
 
 
-def get_person_statistics(course_id):
-    """Get statistics for a course"""
-    from models import Person
+# Read-only snapshot of a CustomQuestion, safe to share between requests and threads
+CachedQuestion = namedtuple('CachedQuestion', ['id', 'course_id', 'label', 'field_type', 'required', 'order'])
+
+# Ordered questions per course: course_id -> (questions_version, [CachedQuestion])
+_course_questions = {}
+_course_questions_lock = threading.Lock()
+
+
+def get_course_questions(course):
+    """
+    Get a course's custom questions in form order
+    Cached per process and reloaded when course.questions_version changes,
+    so edits made through any worker are picked up
+    """
+    from models import CustomQuestion
+    
+    cached = _course_questions.get(course.id)
+    if cached is not None and cached[0] == course.questions_version:
+        return cached[1]
+    
+    questions = [
+        CachedQuestion(question.id, question.course_id, question.label,
+                       question.field_type, question.required, question.order)
+        for question in CustomQuestion.query.filter_by(course_id=course.id).order_by(CustomQuestion.order)
+    ]
+    
+    with _course_questions_lock:
+        _course_questions[course.id] = (course.questions_version, questions)
+    
+    return questions
+
+
+def bump_questions_version(course_id):
+    """Mark a course's questions as changed; commit together with the change"""
+    from models import Course
     
-    stats = {
+    Course.query.filter_by(id=course_id).update({
+        'questions_version': Course.questions_version + 1
+    }, synchronize_session=False)
+
+
+# Maps Person.role to its sub-dict key in the statistics dict
+ROLE_STATS_KEYS = {
+    'PARTICIPANT': 'participants',
+    'FACULTY': 'faculty',
+}
+
+
+def _empty_person_statistics():
+    """Return a zeroed statistics dict"""
+    return {
         'total_invited': 0,
         'total_attending': 0,
         'total_not_attending': 0,
@@ -575,67 +1133,225 @@ def get_person_statistics(course_id):
             'not_attending': 0,
         }
     }
+
+
+def _add_person_statistics(stats, role, status, info_completed, hotel_completed, count):
+    """Fold one grouped (role, status, info, hotel) count into a stats dict"""
+    role_stats = stats[ROLE_STATS_KEYS.get(role, 'participants')]
     
-    persons = Person.query.filter_by(course_id=course_id).all()
+    stats['total_invited'] += count
+    role_stats['invited'] += count
     
-    for person in persons:
-        stats['total_invited'] += 1
+    # Count by status
+    if status == 'ATTENDING':
+        stats['total_attending'] += count
+        role_stats['attending'] += count
         
-        # Count by status
-        if person.status == 'ATTENDING':
-            stats['total_attending'] += 1
-            stats[person.role.lower()]['attending'] += 1
-            
-            # Info completion
-            if person.info_completed:
-                stats['info_completed'] += 1
-            else:
-                stats['info_pending'] += 1
-            
-            # Hotel completion
-            if person.hotel_request and person.hotel_request.completed:
-                stats['hotel_completed'] += 1
-            else:
-                stats['hotel_pending'] += 1
-                
-        elif person.status == 'NOT_ATTENDING':
-            stats['total_not_attending'] += 1
-            stats[person.role.lower()]['not_attending'] += 1
+        # Info completion
+        if info_completed:
+            stats['info_completed'] += count
         else:
-            stats['total_no_response'] += 1
+            stats['info_pending'] += count
         
-        # Count by role
-        stats[person.role.lower()]['invited'] += 1
+        # Hotel completion (no hotel request row counts as pending)
+        if hotel_completed:
+            stats['hotel_completed'] += count
+        else:
+            stats['hotel_pending'] += count
+    
+    elif status == 'NOT_ATTENDING':
+        stats['total_not_attending'] += count
+        role_stats['not_attending'] += count
+    else:
+        stats['total_no_response'] += count
+
+
+def get_person_statistics(course_id):
+    """Get statistics for a course"""
+    return get_courses_statistics([course_id])[course_id]
+
+
+def get_courses_statistics(course_ids):
+    """
+    Get statistics for several courses at once
+    Computed with a single grouped COUNT query instead of loading every person
+    Returns dict of course_id -> stats dict (zeroed for courses without persons)
+    """
+    from models import db, Person, HotelRequest
+    
+    course_ids = list(course_ids)
+    all_stats = {course_id: _empty_person_statistics() for course_id in course_ids}
+    
+    if not course_ids:
+        return all_stats
     
-    return stats
+    rows = db.session.query(
+        Person.course_id,
+        Person.role,
+        Person.status,
+        Person.info_completed,
+        HotelRequest.completed,
+        db.func.count(Person.id)
+    ).outerjoin(
+        HotelRequest, HotelRequest.person_id == Person.id
+    ).filter(
+        Person.course_id.in_(course_ids)
+    ).group_by(
+        Person.course_id,
+        Person.role,
+        Person.status,
+        Person.info_completed,
+        HotelRequest.completed
+    ).all()
+    
+    for course_id, role, status, info_completed, hotel_completed, count in rows:
+        _add_person_statistics(all_stats[course_id], role, status, info_completed, hotel_completed, count)
+    
+    return all_stats
+
+
+# Roster sort options: key -> label (ties are broken by Person.id)
+ROSTER_SORTS = {
+    'created': 'Date Added',
+    'name': 'Last Name',
+    'email': 'Email',
+    'status': 'Status',
+}
+
+
+def _roster_sort_value(person, sort):
+    """Sort key value of a person, as compared in the keyset query"""
+    if sort == 'name':
+        return person.last_name or ''
+    if sort == 'email':
+        return person.email
+    if sort == 'status':
+        return person.status or ''
+    return None
+
+
+def _encode_roster_cursor(person, sort):
+    """Cursor pointing at a person: 'id:sort value'"""
+    value = _roster_sort_value(person, sort)
+    return f"{person.id}:{value}" if value is not None else str(person.id)
+
+
+def _decode_roster_cursor(cursor):
+    """Return (id, sort value) from a cursor, or None if it is malformed"""
+    person_id, _, value = cursor.partition(':')
+    try:
+        return int(person_id), value
+    except ValueError:
+        return None
+
+
+def get_roster_page(course_id, filters=None, sort='created', after=None, before=None, page_size=None):
+    """
+    Get one page of a course roster with keyset pagination
+    Filters: role, status, info ('completed'/'pending') and hotel ('completed'/'pending')
+    `after`/`before` are cursors from a previous page; hotel requests are eager-loaded
+    Returns (persons, total, prev_cursor, next_cursor) - cursors are None at either end
+    """
+    from models import db, Person, HotelRequest
+    from sqlalchemy.orm import selectinload
+    
+    filters = filters or {}
+    page_size = page_size or Config.ITEMS_PER_PAGE
+    if sort not in ROSTER_SORTS:
+        sort = 'created'
+    
+    query = Person.query.filter(Person.course_id == course_id)
+    
+    if filters.get('role'):
+        query = query.filter(Person.role == filters['role'])
+    if filters.get('status'):
+        query = query.filter(Person.status == filters['status'])
+    
+    if filters.get('info') == 'completed':
+        query = query.filter(Person.info_completed.is_(True))
+    elif filters.get('info') == 'pending':
+        query = query.filter(Person.info_completed.isnot(True))
+    
+    if filters.get('hotel') in ('completed', 'pending'):
+        query = query.outerjoin(HotelRequest, HotelRequest.person_id == Person.id)
+        if filters['hotel'] == 'completed':
+            query = query.filter(HotelRequest.completed.is_(True))
+        else:
+            query = query.filter(HotelRequest.completed.isnot(True))
+    
+    total = query.count()
+    
+    sort_column = {
+        'name': db.func.coalesce(Person.last_name, ''),
+        'email': Person.email,
+        'status': db.func.coalesce(Person.status, ''),
+    }.get(sort)
+    
+    # Walk backwards from a `before` cursor, forwards otherwise
+    backwards = bool(before)
+    cursor = _decode_roster_cursor(before or after or '')
+    
+    if cursor:
+        cursor_id, cursor_value = cursor
+        if sort_column is None:
+            query = query.filter(Person.id < cursor_id if backwards else Person.id > cursor_id)
+        elif backwards:
+            query = query.filter(db.or_(
+                sort_column < cursor_value,
+                db.and_(sort_column == cursor_value, Person.id < cursor_id)
+            ))
+        else:
+            query = query.filter(db.or_(
+                sort_column > cursor_value,
+                db.and_(sort_column == cursor_value, Person.id > cursor_id)
+            ))
+    
+    order = [Person.id] if sort_column is None else [sort_column, Person.id]
+    if backwards:
+        order = [column.desc() for column in order]
+    
+    # One extra row tells whether there is a page beyond this one
+    rows = query.options(
+        selectinload(Person.hotel_request)
+    ).order_by(*order).limit(page_size + 1).all()
+    
+    has_more = len(rows) > page_size
+    persons = rows[:page_size]
+    if backwards:
+        persons.reverse()
+    
+    if not persons:
+        return persons, total, None, None
+    
+    first_cursor = _encode_roster_cursor(persons[0], sort)
+    last_cursor = _encode_roster_cursor(persons[-1], sort)
+    
+    if backwards:
+        return persons, total, first_cursor if has_more else None, last_cursor
+    return persons, total, first_cursor if cursor else None, last_cursor if has_more else None
 
 
 def save_uploaded_file(file, person):
     """
     Save uploaded file and return UploadedFile object
+    Identical content is stored once and shared between UploadedFile rows
     """
     from models import UploadedFile
-    import uuid
+    from file_storage import store_upload
     
     if file and allowed_file(file.filename):
-        # Generate unique filename
         original_filename = secure_filename(file.filename)
-        file_extension = original_filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{uuid.uuid4().hex}.{file_extension}"
-        
-        # Save file
-        filepath = os.path.join(Config.UPLOAD_FOLDER, unique_filename)
-        file.save(filepath)
         
-        # Get file size
-        file_size = os.path.getsize(filepath)
+        # Save file (size and checksum come from the same pass over the data)
+        stored_filename, file_size, sha256 = store_upload(file)
         
         # Create database record
         uploaded_file = UploadedFile(
             person_id=person.id,
-            filename=unique_filename,
+            filename=stored_filename,
             original_filename=original_filename,
-            file_size=file_size
+            file_size=file_size,
+            sha256=sha256
         )
         
         return uploaded_file
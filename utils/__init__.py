@@ -1,23 +0,0 @@
-"""
-Utility functions package
-"""
-
-from .email import send_email
-from .helpers import (
-    allowed_file,
-    save_uploaded_file,
-    get_file_icon,
-    format_file_size,
-    generate_token,
-    verify_token
-)
-
-__all__ = [
-    'send_email',
-    'allowed_file',
-    'save_uploaded_file',
-    'get_file_icon',
-    'format_file_size',
-    'generate_token',
-    'verify_token'
-]
\ No newline at end of file